@@ -3,33 +3,45 @@ from constants import *
 import random
 
 class Asteroid(CircleShape):
+    # random number source for splits, Game swaps in its own seeded one
+    rng = random
+    # total splits so far, lets the profiler spot frames with a burst of splits
+    split_count = 0
+    # ParticleSystem for debris, Game sets this when it draws anything
+    particles = None
+
     def __init__(self, x, y, radius):
         super().__init__(x, y, radius)
     
-    def draw(self, screen):
-        pygame.draw.circle(screen, "white", self.position, self.radius, 2)
+    def draw(self, screen, alpha=1.0):
+        pygame.draw.circle(screen, "white", self.screen_position(alpha), self.radius * self.draw_scale, self.outline_width)
     
     def update(self, dt):
         self.position += self.velocity * dt
+        self.age += dt
     
     def split(self):
         #asteroid is always destroyed
         self.kill()
+        Asteroid.split_count += 1
+        if self.particles is not None:
+            self.particles.explode(self.position, self.velocity, self.radius)
         
         #if the asteroid is the smallest possible size, that is all
         if self.radius <= ASTEROID_MIN_RADIUS:
             return
         
-        random_angle = random.uniform(20, 50)
+        random_angle = self.rng.uniform(20, 50)
         new_vector1 = self.velocity.rotate(random_angle)
         new_vector2 = self.velocity.rotate(-random_angle)
         new_radius = self.radius - ASTEROID_MIN_RADIUS
         
         #the new asteroids are slightly faster
-        new_asteroid_1 = Asteroid(self.position.x, self.position.y, new_radius)
-        new_asteroid_1.velocity = new_vector1 * 1.2
+        #create() keeps the children the same kind of asteroid as the parent (and uses its pool)
+        new_asteroid_1 = self.create(self.position.x, self.position.y, new_radius)
+        new_asteroid_1.velocity = new_vector1 * ASTEROID_SPLIT_SPEEDUP
         
-        new_asteroid_2 = Asteroid(self.position.x, self.position.y, new_radius)
-        new_asteroid_2.velocity = new_vector2 * 1.2
+        new_asteroid_2 = self.create(self.position.x, self.position.y, new_radius)
+        new_asteroid_2.velocity = new_vector2 * ASTEROID_SPLIT_SPEEDUP
         
         #self.position ensures they spawn where the old asteroid died
\ No newline at end of file
@@ -1,51 +1,129 @@
 import pygame
 import random
+from typing import NamedTuple
+import numpy as np
 from asteroid import Asteroid
 from constants import *
+from waves import classic_waves
+
+
+# Pre-generated random numbers for ASTEROID_SPAWN_TABLE_SIZE spawns, one row
+# per spawn, still in unit form so any wave can map them onto its own ranges
+class SpawnTable(NamedTuple):
+    positions: np.ndarray  # (n, 2) just off screen on a random edge
+    headings: np.ndarray  # degrees, straight in from that edge
+    speeds: np.ndarray  # 0..1, across the wave's speed range
+    turns: np.ndarray  # -1..1, times the wave's spread
+    kinds: np.ndarray  # 0..1, picks one of the wave's kinds
+
+
+def spawn_table(key, block):
+    """Rows block * ASTEROID_SPAWN_TABLE_SIZE onwards of the tables for key"""
+    # every block has its own generator, so any block can be (re)built on its own
+    rng = np.random.default_rng((key, block))
+    n = ASTEROID_SPAWN_TABLE_SIZE
+    edges = rng.integers(0, 4, n)  # left, right, top, bottom
+    along = rng.random(n)
+    across = edges < 2
+    positions = np.empty((n, 2))
+    positions[:, 0] = np.where(across, np.where(edges == 0, -ASTEROID_MAX_RADIUS, SCREEN_WIDTH + ASTEROID_MAX_RADIUS),
+                               along * SCREEN_WIDTH)
+    positions[:, 1] = np.where(across, along * SCREEN_HEIGHT,
+                               np.where(edges == 2, -ASTEROID_MAX_RADIUS, SCREEN_HEIGHT + ASTEROID_MAX_RADIUS))
+    headings = np.array([0.0, 180.0, 90.0, -90.0])[edges]
+    return SpawnTable(positions, headings, rng.random(n), rng.uniform(-1.0, 1.0, n), rng.random(n))
 
 
 class AsteroidField(pygame.sprite.Sprite):
-    edges = [
-        [
-            pygame.Vector2(1, 0),
-            lambda y: pygame.Vector2(-ASTEROID_MAX_RADIUS, y * SCREEN_HEIGHT),
-        ],
-        [
-            pygame.Vector2(-1, 0),
-            lambda y: pygame.Vector2(
-                SCREEN_WIDTH + ASTEROID_MAX_RADIUS, y * SCREEN_HEIGHT
-            ),
-        ],
-        [
-            pygame.Vector2(0, 1),
-            lambda x: pygame.Vector2(x * SCREEN_WIDTH, -ASTEROID_MAX_RADIUS),
-        ],
-        [
-            pygame.Vector2(0, -1),
-            lambda x: pygame.Vector2(
-                x * SCREEN_WIDTH, SCREEN_HEIGHT + ASTEROID_MAX_RADIUS
-            ),
-        ],
-    ]
-
-    def __init__(self):
+    # the class used for new asteroids, Game swaps this out for the entity store
+    asteroid_class = Asteroid
+    # random number source for spawns, Game swaps in its own seeded one
+    rng = random
+    # live asteroids, for waves with a max_asteroids
+    asteroids = ()
+
+    def __init__(self, waves=None):
         pygame.sprite.Sprite.__init__(self, self.containers)
-        self.spawn_timer = 0.0
+        self.waves = waves if waves is not None else classic_waves()
+        self.spawn_timer = 0.0  # time since the last batch
+        self.elapsed = 0.0  # time since the field started, decides the wave
+        self.spawned = 0  # also the next row of the spawn tables
+        # Positions and velocities come from tables generated in bulk instead
+        # of a few rng calls per asteroid. They're keyed off the game's rng so
+        # the seed still decides everything
+        self.table_key = self.rng.getrandbits(64)
+        self.table_block = None
+        self.table = None
 
     def spawn(self, radius, position, velocity):
-        asteroid = Asteroid(position.x, position.y, radius)
+        asteroid = self.asteroid_class.create(position.x, position.y, radius)
         asteroid.velocity = velocity
+        self.spawned += 1
+
+    def table_rows(self, count):
+        """The next count rows of the spawn tables, as one SpawnTable"""
+        parts = []
+        start = self.spawned
+        while count > 0:
+            block, offset = divmod(start, ASTEROID_SPAWN_TABLE_SIZE)
+            if block != self.table_block:
+                self.table = spawn_table(self.table_key, block)
+                self.table_block = block
+            take = min(count, ASTEROID_SPAWN_TABLE_SIZE - offset)
+            parts.append([column[offset:offset + take] for column in self.table])
+            start += take
+            count -= take
+        if len(parts) == 1:
+            return SpawnTable(*parts[0])
+        return SpawnTable(*(np.concatenate(columns) for columns in zip(*parts)))
+
+    def spawn_batch(self, wave, count):
+        """Bring in count asteroids from the edges, as wave describes them"""
+        rows = self.table_rows(count)
+        low, high = wave.speed
+        speeds = low + rows.speeds * (high - low)
+        angles = np.radians(rows.headings + rows.turns * wave.spread)
+        velocities = np.column_stack((np.cos(angles) * speeds, np.sin(angles) * speeds))
+        kinds = np.asarray(wave.kinds)[(rows.kinds * len(wave.kinds)).astype(np.intp)]
+        radii = kinds * ASTEROID_MIN_RADIUS
+
+        create = self.asteroid_class.create
+        asteroids = [create(x, y, radius) for (x, y), radius in zip(rows.positions.tolist(), radii.tolist())]
+        store = getattr(asteroids[0], "store", None)
+        if store is not None:
+            # stored asteroids: one array write instead of a velocity setter each
+            slots = np.fromiter((asteroid.slot for asteroid in asteroids), dtype=np.intp, count=count)
+            store.velocities[slots] = velocities
+        else:
+            for asteroid, (vx, vy) in zip(asteroids, velocities.tolist()):
+                asteroid.velocity = pygame.Vector2(vx, vy)
+        self.spawned += count
 
     def update(self, dt):
-        self.spawn_timer += dt
-        if self.spawn_timer > ASTEROID_SPAWN_RATE:
-            self.spawn_timer = 0
-
-            # spawn a new asteroid at a random edge
-            edge = random.choice(self.edges)
-            speed = random.randint(40, 100)
-            velocity = edge[0] * speed
-            velocity = velocity.rotate(random.randint(-30, 30))
-            position = edge[1](random.uniform(0, 1))
-            kind = random.randint(1, ASTEROID_KINDS)
-            self.spawn(ASTEROID_MIN_RADIUS * kind, position, velocity)
\ No newline at end of file
+        # Walk through the batches due this step one by one, each at its own
+        # time, so spawns land on the same schedule whatever the tick length
+        # and a step crossing into the next wave spawns for both. Batches in a
+        # row from the same wave are still spawned together
+        end = self.elapsed + dt
+        wave = None
+        count = 0
+        while True:
+            current, batch = self.waves.wave_at(self.elapsed)
+            due = self.elapsed + current.interval - self.spawn_timer
+            if due > end:
+                break
+            if current is not wave:
+                self.spawn_wave(wave, count)
+                wave, count = current, 0
+            count += batch
+            self.elapsed = due
+            self.spawn_timer = 0.0
+        self.spawn_wave(wave, count)
+        self.spawn_timer += end - self.elapsed
+        self.elapsed = end
+
+    def spawn_wave(self, wave, count):
+        if wave is not None and wave.max_asteroids is not None:
+            count = min(count, wave.max_asteroids - len(self.asteroids))
+        if count > 0:
+            self.spawn_batch(wave, count)
@@ -0,0 +1,164 @@
+# Plays lots of independent headless games on a process pool, e.g. for
+# balancing constants.py. Each game gets its own seed and a bot policy, and one
+# JSON line per finished game is streamed to the results file.
+#
+# Usage:
+#   python batchrunner.py --games 1000 --policy aim --output results.jsonl
+#   python batchrunner.py --games 500 --set ASTEROID_SPAWN_RATE=0.5 --set PLAYER_SHOOT_COOLDOWN=0.2
+import argparse
+import ast
+import json
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+import constants
+from constants import *
+from game import Game
+from asteroid import Asteroid
+from policies import POLICIES, make_policy
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Constants the game reads once, while its modules are imported (default
+# arguments, class attributes, module-level values), so patching them in
+# apply_overrides afterwards changes nothing. --set refuses these; add to it
+# when a module starts reading a constant at import time
+IMPORT_TIME_CONSTANTS = {
+    "ENTITY_STORE_CAPACITY": "entitystore",
+    "HIGH_SCORE_COUNT": "scorestore",
+    "OFFSCREEN_MARGIN": "circleshape",
+    "OUTLINE_WIDTH": "circleshape, spriteatlas",
+    "PARTICLE_CAPACITY": "particles",
+    "POOL_MAX_SIZE": "pool",
+    "PROFILER_WINDOW": "profiler",
+    "QUALITY_FRAME_BUDGET_MS": "quality",
+    "QUALITY_WINDOW": "quality",
+    "SHOT_LIFETIME": "shots",
+    "SNAPSHOT_BUFFER_BYTES": "snapshot",
+    "SPATIAL_HASH_CELL_SIZE": "entitystore, spatialhash",
+    "TEXT_CACHE_SIZE": "textcache",
+    "USE_ENTITY_STORE": "game",
+    "WINDOW_HEIGHT": "game",
+    "WINDOW_WIDTH": "game",
+}
+
+
+def apply_overrides(overrides):
+    # The game modules all do `from constants import *`, so patching the
+    # constants module alone isn't enough. Only values read at runtime pick
+    # this up; derived constants (e.g. ASTEROID_MAX_RADIUS) keep their value
+    for module in game_modules():
+        for name, value in overrides.items():
+            if hasattr(module, name):
+                setattr(module, name, value)
+
+
+def init_worker(overrides):
+    # each worker sets up pygame once and then plays many games
+    sys.stdout = open(os.devnull, "w")  # Game prints a banner every time it starts
+    apply_overrides(overrides)
+    pygame.init()
+
+
+def play_game(seed, policy_name, max_frames):
+    policy = make_policy(policy_name, seed)
+    game = Game(seed=seed, input_source=policy, headless=True, render=False)
+    if hasattr(policy, "bind"):
+        policy.bind(game)
+    splits_before = Asteroid.split_count
+    start = time.perf_counter()
+    frames = game.run_headless(max_frames, 1 / game.simulation_rate)
+    return {
+        "seed": seed,
+        "policy": policy_name,
+        "score": game.score,
+        "survival_seconds": frames / game.simulation_rate,
+        "game_over": game.game_state != "playing",
+        "frames": frames,
+        "asteroids_spawned": game.asteroid_field.spawned,
+        "shots_fired": game.player.shots_fired,
+        "splits": Asteroid.split_count - splits_before,
+        "entities_spawned": game.asteroid_field.spawned + game.player.shots_fired,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def game_modules():
+    for module in list(sys.modules.values()):
+        path = getattr(module, "__file__", None)
+        if path is not None and path.endswith(".py") and os.path.dirname(os.path.abspath(path)) == GAME_DIR:
+            yield module
+
+
+def parse_override(text):
+    name, _, text_value = text.partition("=")
+    if not hasattr(constants, name):
+        raise argparse.ArgumentTypeError(f"unknown constant {name}")
+    current = getattr(constants, name)
+    try:
+        value = ast.literal_eval(text_value)
+    except (ValueError, SyntaxError):
+        if not isinstance(current, str):
+            raise argparse.ArgumentTypeError(f"{name}: can't read {text_value!r} as a Python value") from None
+        value = text_value
+    if isinstance(current, float) and type(value) is int:
+        value = float(value)
+    # exact types, so True doesn't pass for an int or "False" for a bool
+    if type(value) is not type(current):
+        raise argparse.ArgumentTypeError(f"{name} is a {type(current).__name__}, got {value!r}")
+    if name in IMPORT_TIME_CONSTANTS:
+        raise argparse.ArgumentTypeError(f"{name} is read when {IMPORT_TIME_CONSTANTS[name]} is imported, "
+                                         "so overriding it here would change nothing")
+    return name, value
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run many headless games in parallel")
+    parser.add_argument("--games", type=int, default=100)
+    parser.add_argument("--policy", choices=list(POLICIES), default="aim")
+    parser.add_argument("--seed", type=int, default=0, help="first seed, game i uses seed + i")
+    parser.add_argument("--max-seconds", type=float, default=300, help="cap on simulated time per game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--set", type=parse_override, action="append", default=[], metavar="NAME=VALUE",
+                        help="override a value from constants.py in every game")
+    parser.add_argument("--output", default="batch_results.jsonl")
+    args = parser.parse_args()
+
+    overrides = dict(args.set)
+    max_frames = int(args.max_seconds * SIMULATION_RATE)
+    results = []
+    start = time.perf_counter()
+    with open(args.output, "w") as output, ProcessPoolExecutor(
+        max_workers=args.workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_worker,
+        initargs=(overrides,),
+    ) as pool:
+        output.write(json.dumps({"config": {"policy": args.policy, "overrides": overrides,
+                                            "max_seconds": args.max_seconds}}) + "\n")
+        futures = [pool.submit(play_game, args.seed + i, args.policy, max_frames) for i in range(args.games)]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            output.write(json.dumps(result) + "\n")
+    elapsed = time.perf_counter() - start
+
+    frames = sum(result["frames"] for result in results)
+    scores = [result["score"] for result in results]
+    survival = [result["survival_seconds"] for result in results]
+    print(f"{len(results)} games, {frames} frames in {elapsed:.1f}s with {args.workers} workers "
+          f"({len(results) / elapsed:.1f} games/s, {frames / elapsed:.0f} frames/s)")
+    print(f"score: mean {statistics.mean(scores):.0f}, median {statistics.median(scores):.0f}, max {max(scores)}")
+    print(f"survival: mean {statistics.mean(survival):.1f}s, median {statistics.median(survival):.1f}s")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# How many shot/asteroid hits each tick rate catches, with end-of-step overlap
+# tests against swept collisions. A volley of fast shots from the left edge
+# flies into a field of small asteroids for a second, and the asteroids
+# destroyed are compared with a 240Hz swept run.
+# Usage: python bench_collisions.py [--rates 240 60 30 15 10 5] [--asteroids 200] [--shots 400]
+import argparse
+import os
+import random
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from constants import *
+from game import Game
+from inputsource import HeldInput
+
+
+def gallery(rate, swept, use_entity_store, asteroids, shots, seed, seconds=1.0):
+    """Asteroids destroyed after `seconds`, and ms spent on collisions per step"""
+    game = Game(use_entity_store=use_entity_store, seed=seed, input_source=HeldInput(), headless=True, render=False)
+    game.use_swept_collisions = swept
+    game.player.position.update(-1000, -1000)  # out of the way, only shots hit things
+    rng = random.Random(seed)
+    for _ in range(asteroids):
+        # kept far enough inside the screen that none of them drift off and get culled
+        asteroid = game.asteroid_field.asteroid_class(rng.uniform(SCREEN_WIDTH / 4, SCREEN_WIDTH - 40),
+                                                      rng.uniform(40, SCREEN_HEIGHT - 40), ASTEROID_MIN_RADIUS)
+        asteroid.velocity = pygame.Vector2(rng.uniform(0, 150), 0).rotate(rng.uniform(0, 360))
+    for _ in range(shots):
+        shot = game.player.shot_class(rng.uniform(0, SCREEN_WIDTH / 8), rng.uniform(0, SCREEN_HEIGHT))
+        shot.velocity = pygame.Vector2(PLAYER_SHOOT_SPEED, 0).rotate(rng.uniform(-30, 30))
+    # the field keeps spawning otherwise, and the spawns would differ between rates
+    game.asteroid_field.kill()
+
+    steps = round(seconds * rate)
+    for _ in range(steps):
+        game.step(1 / rate)
+        game.end_profiler_frame()
+    collision_ms = sum(game.profiler.samples["collisions"]) / len(game.profiler.samples["collisions"])
+    # they're all the smallest kind, so a hit one is gone for good
+    return asteroids - len(game.asteroids), collision_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Swept vs end-of-step collision benchmark")
+    parser.add_argument("--rates", type=int, nargs="+", default=[240, 60, 30, 15, 10, 5])
+    parser.add_argument("--asteroids", type=int, default=200)
+    parser.add_argument("--shots", type=int, default=400)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--entity-store", action="store_true")
+    args = parser.parse_args()
+
+    pygame.init()
+    reference, _ = gallery(240, True, args.entity_store, args.asteroids, args.shots, args.seed)
+    print(f"240Hz swept reference: {reference} asteroids destroyed")
+    print(f"{'rate':>6} {'discrete':>14} {'ms':>7} {'swept':>11} {'ms':>7}")
+    for rate in args.rates:
+        discrete, discrete_ms = gallery(rate, False, args.entity_store, args.asteroids, args.shots, args.seed)
+        swept, swept_ms = gallery(rate, True, args.entity_store, args.asteroids, args.shots, args.seed)
+        print(f"{rate:>6} {discrete:>8} ({discrete / reference:4.0%}) {discrete_ms:>7.3f} "
+              f"{swept:>5} ({swept / reference:4.0%}) {swept_ms:>7.3f}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# Compares per-frame draw time of the old pygame.draw path against the
+# pre-rendered sprite atlas + Surface.blits path, then what drawing the world
+# at a lower (or higher) internal resolution saves, scaling step included.
+# Usage: python bench_draw.py [--frames 60] [--sizes 100 1000 10000]
+#                             [--scales 2 1 0.75 0.5 0.25] [--window-size 3840 2160]
+import argparse
+import os
+import random
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from constants import *
+from game import Game
+
+
+def populate(game, count, rng):
+    # a rough mix of what's on screen in real play: mostly asteroids, some shots
+    game.player.rotation = rng.uniform(0, 360)
+    for i in range(count):
+        x = rng.uniform(0, SCREEN_WIDTH)
+        y = rng.uniform(0, SCREEN_HEIGHT)
+        if i % 4 == 0:
+            game.player.shot_class(x, y)
+        else:
+            game.asteroid_field.asteroid_class(x, y, ASTEROID_MIN_RADIUS * rng.randint(1, ASTEROID_KINDS))
+
+
+def time_draw(game, use_sprite_atlas, frames):
+    game.use_sprite_atlas = use_sprite_atlas
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.screen.fill("black")
+        if use_sprite_atlas:
+            game.screen.blits([d.blit_item(game.sprite_atlas) for d in game.drawable], False)
+        else:
+            for d in game.drawable:
+                d.draw(game.screen)
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def time_scaled(game, scale, frames):
+    # world + one scaling step into the window, which is what a frame pays
+    game.use_sprite_atlas = True
+    game.set_render_scale(scale)
+    start = time.perf_counter()
+    for _ in range(frames):
+        game.draw_world()
+        game.present_world()
+    return (time.perf_counter() - start) / frames * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sprite drawing benchmark")
+    parser.add_argument("--frames", type=int, default=60)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--scales", type=float, nargs="+", default=[2.0, 1.0, 0.75, 0.5, 0.25])
+    parser.add_argument("--window-size", type=int, nargs=2, default=[WINDOW_WIDTH, WINDOW_HEIGHT])
+    args = parser.parse_args()
+
+    pygame.init()
+    print(f"{'sprites':>8} {'primitives ms':>14} {'atlas ms':>10} {'speedup':>8}")
+    for size in args.sizes:
+        game = Game(seed=1, headless=True)
+        populate(game, size, random.Random(size))
+        primitives = time_draw(game, False, args.frames)
+        atlas = time_draw(game, True, args.frames)
+        print(f"{size:>8} {primitives:>14.3f} {atlas:>10.3f} {primitives / atlas:>7.2f}x")
+
+    width, height = args.window_size
+    print(f"\nworld drawn at a fraction of a {width}x{height} window (atlas, ms per frame)")
+    print(f"{'sprites':>8} " + " ".join(f"{f'x{scale:g}':>8}" for scale in args.scales))
+    for size in args.sizes:
+        game = Game(seed=1, headless=True, window_size=(width, height))
+        populate(game, size, random.Random(size))
+        times = [time_scaled(game, scale, args.frames) for scale in args.scales]
+        print(f"{size:>8} " + " ".join(f"{ms:>8.3f}" for ms in times))
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
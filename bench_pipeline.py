@@ -0,0 +1,62 @@
+# Frame rate of the single-threaded loop against the pipelined one (simulation
+# on a worker thread, drawing on the main thread), on the same seeded game.
+# The player is parked off screen so the game runs the whole way through the
+# wave script, and both runs have to end on the same state hash.
+# Usage: python bench_pipeline.py [--frames 2400] [--waves waves_endurance.json]
+#                                 [--window-size 1920 1080] [--entity-store]
+import argparse
+import os
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from constants import *
+from game import Game
+from inputsource import HeldInput
+from waves import WaveSchedule
+
+# the default wave script sits next to this file, wherever it's run from
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def run(pipelined, args, waves):
+    game = Game(use_entity_store=args.entity_store, seed=args.seed, input_source=HeldInput(), headless=True,
+                window_size=tuple(args.window_size), waves=waves)
+    game.pipelined = pipelined
+    game.player.position.update(-10000, -10000)
+    start = time.perf_counter()
+    game.run_headless(args.frames, 1 / SIMULATION_RATE)
+    elapsed = time.perf_counter() - start
+    stats = None
+    if game.pipeline is not None:
+        game.pipeline.close()
+        stats = game.pipeline.stats()
+    return args.frames / elapsed, game.state_hash(), len(game.asteroids), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipelined simulation/render benchmark")
+    parser.add_argument("--frames", type=int, default=2400)
+    parser.add_argument("--waves", default=os.path.join(GAME_DIR, "waves_endurance.json"))
+    parser.add_argument("--window-size", type=int, nargs=2, default=[WINDOW_WIDTH, WINDOW_HEIGHT])
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--entity-store", action="store_true")
+    args = parser.parse_args()
+
+    pygame.init()
+    waves = WaveSchedule.load(args.waves) if args.waves else None
+    serial_fps, serial_hash, asteroids, _ = run(False, args, waves)
+    pipelined_fps, pipelined_hash, _, stats = run(True, args, waves)
+    print(f"{args.frames} frames, {asteroids} asteroids at the end")
+    print(f"single-threaded {serial_fps:7.1f} fps")
+    print(f"pipelined       {pipelined_fps:7.1f} fps ({pipelined_fps / serial_fps:.2f}x)")
+    print(f"main thread busy {stats['main_busy']:.0%} (cpu {stats['main_cpu']:.0%}), "
+          f"simulation thread busy {stats['worker_busy']:.0%} (cpu {stats['worker_cpu']:.0%}), "
+          f"{stats['wait_ms_per_frame']:.2f}ms per frame waiting on the simulation")
+    print(f"state hashes match: {serial_hash == pipelined_hash}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+# Measures save_state/restore_state cost and snapshot size at different entity
+# counts, for plain sprites and the numpy entity store, and checks that a game
+# forked from a snapshot plays out exactly like the original.
+# Usage: python bench_snapshot.py [--repeats 200] [--sizes 100 1000 10000]
+import argparse
+import os
+import random
+import time
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from constants import *
+from game import Game
+from policies import RandomPolicy
+from snapshot import save_state, restore_state
+from bench_draw import populate
+
+
+def time_snapshots(game, repeats):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        data = save_state(game)
+    save_ms = (time.perf_counter() - start) / repeats * 1000
+    start = time.perf_counter()
+    for _ in range(repeats):
+        restore_state(game, data)
+    restore_ms = (time.perf_counter() - start) / repeats * 1000
+    return save_ms, restore_ms, len(data)
+
+
+def check_fork(use_entity_store, fork_frame=300, end_frame=1800):
+    # play to fork_frame, snapshot, play on; then restore into a brand new Game
+    # with the same inputs from there and compare the final state
+    original = Game(use_entity_store=use_entity_store, seed=3, input_source=RandomPolicy(3), headless=True)
+    original.run_headless(fork_frame)
+    data = save_state(original)
+    policy_state = original.input_source.rng.getstate(), original.input_source.ticks_left, original.input_source.controls
+    original.run_headless(end_frame)
+    expected = (original.frame, original.state_hash())
+
+    policy = RandomPolicy(0)
+    policy.rng.setstate(policy_state[0])
+    policy.ticks_left, policy.controls = policy_state[1:]
+    fork = Game(use_entity_store=use_entity_store, seed=99, input_source=policy, headless=True)
+    restore_state(fork, data)
+    fork.run_headless(end_frame)
+    return (fork.frame, fork.state_hash()) == expected
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Snapshot save/restore benchmark")
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    args = parser.parse_args()
+
+    pygame.init()
+    print(f"{'store':>6} {'entities':>8} {'save ms':>8} {'restore ms':>11} {'bytes':>8} {'frames in buffer':>17}")
+    for use_entity_store in (False, True):
+        for size in args.sizes:
+            game = Game(use_entity_store=use_entity_store, seed=1, headless=True)
+            populate(game, size, random.Random(size))
+            save_ms, restore_ms, size_bytes = time_snapshots(game, args.repeats)
+            print(f"{str(use_entity_store):>6} {size:>8} {save_ms:>8.3f} {restore_ms:>11.3f} "
+                  f"{size_bytes:>8} {SNAPSHOT_BUFFER_BYTES // size_bytes:>17}")
+    for use_entity_store in (False, True):
+        print(f"fork from a snapshot matches the original (entity store {use_entity_store}): "
+              f"{check_fork(use_entity_store)}")
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
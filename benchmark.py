@@ -0,0 +1,258 @@
+# Scripted stress scenarios for the simulation and renderer.
+#
+# Each (scenario, size) case runs in its own process so peak memory is measured
+# per case. Results go to a JSON file that can be compared against a stored
+# baseline, failing (exit code 1) if any case got slower than the threshold.
+# A baseline run with different frames/draw/entity store settings is refused
+# up front (exit code 2), its timings would mean something else.
+#
+# Usage:
+#   python benchmark.py --sizes 100 1000 10000 --output bench.json
+#   python benchmark.py --output new.json --baseline bench.json --threshold 0.15
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+from constants import *
+from game import Game
+from profiler import FrameProfiler
+from inputsource import ScriptedInput, Controls
+
+# Scenario name -> function(game, size, rng) that sets things up, and an optional
+# per-frame function(game, size, rng) that keeps the pressure on
+SCENARIOS = {}
+
+
+def scenario(name, every_frame=None):
+    def register(setup):
+        SCENARIOS[name] = (setup, every_frame)
+        return setup
+    return register
+
+
+def random_position(rng):
+    return rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT)
+
+
+def add_asteroid(game, rng, radius, speed):
+    x, y = random_position(rng)
+    asteroid = game.asteroid_field.asteroid_class.create(x, y, radius)
+    asteroid.velocity = pygame.Vector2(0, speed).rotate(rng.uniform(0, 360))
+    return asteroid
+
+
+def add_shot(game, x, y, rng):
+    shot = game.player.shot_class.create(x, y)
+    shot.velocity = pygame.Vector2(0, PLAYER_SHOOT_SPEED).rotate(rng.uniform(0, 360))
+
+
+@scenario("static")
+def static_asteroids(game, size, rng):
+    # N asteroids that never move: pure per-entity overhead
+    for _ in range(size):
+        add_asteroid(game, rng, ASTEROID_MIN_RADIUS * rng.randint(1, ASTEROID_KINDS), 0)
+
+
+def shot_storm_frame(game, size, rng):
+    for _ in range(max(1, size // 100)):
+        add_shot(game, *random_position(rng), rng)
+
+
+@scenario("shot_storm", every_frame=shot_storm_frame)
+def shot_storm(game, size, rng):
+    # N slow asteroids with shots pouring in from everywhere
+    for _ in range(size):
+        add_asteroid(game, rng, ASTEROID_MIN_RADIUS * rng.randint(1, ASTEROID_KINDS), 10)
+
+
+def cascade_frame(game, size, rng):
+    # aim shots straight at random asteroids so they keep splitting
+    asteroids = game.asteroids.sprites()
+    for asteroid in rng.sample(asteroids, min(len(asteroids), max(1, size // 50))):
+        position = asteroid.position
+        add_shot(game, position.x, position.y, rng)
+
+
+@scenario("cascade", every_frame=cascade_frame)
+def cascade(game, size, rng):
+    # N max-radius asteroids being shot to pieces
+    for _ in range(size):
+        add_asteroid(game, rng, ASTEROID_MAX_RADIUS, 20)
+
+
+def particle_storm_frame(game, size, rng):
+    # particles live 1s on average, so this keeps about `size` of them alive
+    if game.particles is not None:
+        x, y = random_position(rng)
+        game.particles.emit(x, y, max(1, size // SIMULATION_RATE), PARTICLE_DEBRIS_SPEED, (0.5, 1.5),
+                            PARTICLE_DEBRIS_COLOR)
+
+
+@scenario("particle_storm", every_frame=particle_storm_frame)
+def particle_storm(game, size, rng):
+    # a few asteroids and lots of debris (needs drawing on, otherwise there are no particles)
+    for _ in range(10):
+        add_asteroid(game, rng, ASTEROID_MAX_RADIUS, 20)
+
+
+@scenario("long_session")
+def long_session(game, size, rng):
+    # the unmodified game with its AsteroidField; here size is how many frames
+    # to simulate, so it measures how cost grows over a long session
+    pass
+
+
+def peak_memory_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_case(name, size, frames, draw, use_entity_store, seed):
+    pygame.init()
+    game = Game(use_entity_store=use_entity_store, seed=seed, headless=True, render=draw,
+                input_source=ScriptedInput([(1, Controls())]))
+    # park the player out of the way so the run doesn't end in a game over
+    game.player.position.update(-10 * SCREEN_WIDTH, -10 * SCREEN_HEIGHT)
+
+    setup, every_frame = SCENARIOS[name]
+    rng = random.Random(seed)
+    setup(game, size, rng)
+    if name == "long_session":
+        frames = size
+
+    game.profiler = FrameProfiler(window=frames)
+    dt = 1 / SIMULATION_RATE
+    start = time.perf_counter()
+    for _ in range(frames):
+        if every_frame is not None:
+            every_frame(game, size, rng)
+        game.step(dt)
+        if draw:
+            game.draw()
+        game.end_profiler_frame()
+    wall_ms = (time.perf_counter() - start) / frames * 1000
+
+    samples = game.profiler.samples
+    mean = lambda phase: sum(samples[phase]) / len(samples[phase])
+    result = {
+        "scenario": name,
+        "size": size,
+        "frames": frames,
+        "update_ms": mean("update"),
+        "collision_ms": mean("collisions") + mean("cull"),
+        "draw_ms": mean("draw") + mean("flip"),
+        "particles_ms": mean("particles"),
+        "total_ms": mean("frame"),
+        "total_p95_ms": game.profiler.stats()["frame"]["p95"],
+        "wall_ms": wall_ms,
+        "entities": len(game.asteroids) + len(game.shots),
+        "peak_memory_mb": peak_memory_mb(),
+    }
+    pygame.quit()
+    return result
+
+
+def compare(results, baseline, threshold):
+    """Return a list of (case, metric, old, new) for metrics slower than threshold"""
+    old_cases = {(r["scenario"], r["size"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        old = old_cases.get((result["scenario"], result["size"]))
+        if old is None:
+            continue
+        for metric in ("update_ms", "collision_ms", "draw_ms", "particles_ms", "total_ms"):
+            # ignore noise on phases that barely take any time
+            if old.get(metric, 0.0) < 0.05:
+                continue
+            if result[metric] > old[metric] * (1 + threshold):
+                regressions.append((f"{result['scenario']}/{result['size']}", metric, old[metric], result[metric]))
+    return regressions
+
+
+# run settings that change what the timings mean, so runs have to agree on them to be compared
+COMPARABLE_SETTINGS = ("frames", "draw", "entity_store")
+
+
+def mismatched_settings(meta, baseline_meta):
+    """(setting, baseline value, this run's value) for every comparable setting that differs"""
+    return [(name, baseline_meta.get(name), meta[name]) for name in COMPARABLE_SETTINGS
+            if baseline_meta.get(name) != meta[name]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Asteroids stress benchmarks")
+    parser.add_argument("--scenarios", nargs="+", default=list(SCENARIOS), choices=list(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--frames", type=int, default=120, help="frames per case (long_session uses size)")
+    parser.add_argument("--no-draw", action="store_true", help="only measure the simulation")
+    parser.add_argument("--entity-store", action="store_true", help="use the numpy entity store")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--baseline", default=None, help="earlier results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="allowed slowdown before a metric counts as a regression (0.10 = 10%%)")
+    args = parser.parse_args()
+
+    meta = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "frames": args.frames,
+        "draw": not args.no_draw,
+        "entity_store": args.entity_store,
+        "seed": args.seed,
+    }
+    baseline = None
+    if args.baseline is not None:
+        # check before spending minutes on a run that can't be compared anyway
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        mismatches = mismatched_settings(meta, baseline.get("meta", {}))
+        if mismatches:
+            for name, old, new in mismatches:
+                print(f"Can't compare against {args.baseline}: it was run with {name}={old}, this run has {name}={new}")
+            sys.exit(2)
+
+    results = []
+    print(f"{'case':<22} {'update':>8} {'collide':>8} {'draw':>8} {'particles':>9} {'total':>8} {'p95':>8} {'mem MB':>8}")
+    for name in args.scenarios:
+        for size in args.sizes:
+            # a fresh process per case so peak memory belongs to that case alone
+            with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as pool:
+                result = pool.submit(run_case, name, size, args.frames, not args.no_draw,
+                                     args.entity_store, args.seed).result()
+            results.append(result)
+            memory = result["peak_memory_mb"]
+            print(f"{name + '/' + str(size):<22} {result['update_ms']:8.3f} {result['collision_ms']:8.3f} "
+                  f"{result['draw_ms']:8.3f} {result['particles_ms']:9.3f} {result['total_ms']:8.3f} {result['total_p95_ms']:8.3f} "
+                  f"{memory if memory is None else round(memory, 1):>8}")
+
+    report = {"meta": meta, "results": results}
+    with open(args.output, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"Results written to {args.output}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        for case, metric, old, new in regressions:
+            print(f"REGRESSION {case} {metric}: {old:.3f}ms -> {new:.3f}ms ({new / old - 1:+.0%})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,135 @@
+import math
 import pygame
+from constants import *
+
+
+def time_of_impact(start_a, end_a, start_b, end_b, reach):
+    """When two circles moving in straight lines over a step first touch.
+
+    Returns the fraction of the step (0 to 1) or None if they don't touch. reach
+    is the sum of their radii. Already overlapping at the start counts as 0.
+    """
+    # solve |offset + motion * t| = reach for the earliest t, relative to b
+    offset_x = start_a.x - start_b.x
+    offset_y = start_a.y - start_b.y
+    c = offset_x * offset_x + offset_y * offset_y - reach * reach
+    if c < 0:
+        return 0.0
+    motion_x = (end_a.x - start_a.x) - (end_b.x - start_b.x)
+    motion_y = (end_a.y - start_a.y) - (end_b.y - start_b.y)
+    a = motion_x * motion_x + motion_y * motion_y
+    b = offset_x * motion_x + offset_y * motion_y
+    discriminant = b * b - a * c
+    if a == 0 or b >= 0 or discriminant < 0:
+        return None  # not moving relative to each other, moving apart, or missing
+    t = (-b - math.sqrt(discriminant)) / a
+    return t if t <= 1.0 else None
 
 # Base class for game objects
 class CircleShape(pygame.sprite.Sprite):
+    # Lifetime policy: how far past the screen edges a shape can drift before it
+    # gets culled (None = never), and an optional time-to-live in seconds
+    offscreen_margin = OFFSCREEN_MARGIN
+    ttl = None
+    # ShapePool to recycle instances through (None = always allocate new ones)
+    pool = None
+    # how many shapes have ever been constructed, used for per-frame allocation counts
+    allocations = 0
+    # outline thickness in px, the quality governor changes this for every shape
+    outline_width = OUTLINE_WIDTH
+    # pixels per world unit on the surface draw() paints on, Game sets this
+    # when the world is drawn at a different resolution than the playfield
+    draw_scale = 1.0
+
     def __init__(self, x, y, radius):
         # we will be using this later
         if hasattr(self, "containers"):
             super().__init__(self.containers)
         else:
             super().__init__()
+        CircleShape.allocations += 1
 
         self.position = pygame.Vector2(x, y)
         self.velocity = pygame.Vector2(0, 0)
         self.radius = radius
+        self.age = 0.0
+        # where the shape was at the start of the last step, for interpolated drawing
+        self.previous_position = pygame.Vector2(x, y)
+
+    @classmethod
+    def create(cls, *args):
+        # takes a recycled instance from the pool when there is one
+        if cls.pool is not None:
+            return cls.pool.acquire(*args)
+        return cls(*args)
+
+    def reset(self, x, y, radius):
+        # put a recycled shape back in its just-constructed state, reusing the vectors
+        self.position.update(x, y)
+        self.velocity.update(0, 0)
+        self.radius = radius
+        self.age = 0.0
+        self.previous_position.update(x, y)
+
+    def kill(self):
+        # only the first kill hands the shape back, split() can run twice in a frame
+        was_alive = self.alive()
+        super().kill()
+        if was_alive:
+            self.release()
 
-    def draw(self, screen):
+    def release(self):
+        # called once the shape has left its groups
+        if self.pool is not None:
+            self.pool.release(self)
+
+    def draw(self, screen, alpha=1.0):
         # sub-classes must override
         pass
 
+    def save_previous_state(self):
+        self.previous_position.update(self.position)
+
+    def render_position(self, alpha=1.0):
+        # alpha is how far we are from the previous step (0) to the current one (1)
+        if alpha >= 1.0:
+            return self.position
+        return self.previous_position.lerp(self.position, alpha)
+
+    def screen_position(self, alpha=1.0):
+        # render_position in pixels of the surface being drawn on
+        return self.render_position(alpha) * self.draw_scale
+
     def update(self, dt):
         # sub-classes must override
         pass
 
+    def blit_item(self, atlas, alpha=1.0):
+        # (surface, position) pair for Surface.blits, looked up in a SpriteAtlas
+        surface, half = atlas.circle(self.radius)
+        position = self.render_position(alpha) * atlas.scale
+        return (surface, (position.x - half, position.y - half))
+
+    def is_expired(self):
+        if self.ttl is not None and self.age >= self.ttl:
+            return True
+        if self.offscreen_margin is None:
+            return False
+        margin = self.offscreen_margin
+        return (
+            self.position.x < -margin
+            or self.position.x > SCREEN_WIDTH + margin
+            or self.position.y < -margin
+            or self.position.y > SCREEN_HEIGHT + margin
+        )
+
     def collide(self, shape):
+        # compare squared distances so we don't need a square root per check
         combined_radius = self.radius + shape.radius
-        distance = self.position.distance_to(shape.position)
-        return combined_radius > distance
\ No newline at end of file
+        distance_squared = self.position.distance_squared_to(shape.position)
+        return combined_radius * combined_radius > distance_squared
+
+    def collide_swept(self, shape):
+        # did the two touch at any point during the last step (see time_of_impact)
+        return time_of_impact(self.previous_position, self.position, shape.previous_position, shape.position,
+                              self.radius + shape.radius) is not None
@@ -1,10 +1,35 @@
+# Size of the playfield, in world units. Everything in the simulation works in these
 SCREEN_WIDTH = 1280
 SCREEN_HEIGHT = 720
 
+# Size of the window. The world is fitted into it (letterboxed if the shape
+# differs), drawn offscreen at RENDER_SCALE times the window's resolution and
+# scaled up (or down) to it in one go. The HUD is always drawn at full resolution
+WINDOW_WIDTH = SCREEN_WIDTH
+WINDOW_HEIGHT = SCREEN_HEIGHT
+RENDER_SCALE = 1.0
+
+# The simulation runs in fixed steps of 1/SIMULATION_RATE seconds, independent
+# of how fast frames are drawn. Rendering interpolates between the last two steps
+SIMULATION_RATE = 60  # steps per second
+MAX_CATCHUP_STEPS = 5  # after a long frame, drop time beyond this many steps
+RENDER_FPS = 60  # 0 = draw as fast as possible
+INTERPOLATE_RENDERING = True
+# Simulate the next frame on a worker thread while the main thread draws the
+# last one (see pipeline.py)
+PIPELINED_SIMULATION = False
+MENU_FPS = 15  # menus only wait for key presses, no need to spin at 60
+
+TEXT_CACHE_SIZE = 128  # rendered text surfaces kept around
+
 ASTEROID_MIN_RADIUS = 20
 ASTEROID_KINDS = 3
 ASTEROID_SPAWN_RATE = 0.8  # seconds
 ASTEROID_MAX_RADIUS = ASTEROID_MIN_RADIUS * ASTEROID_KINDS
+ASTEROID_SPLIT_SPEEDUP = 1.2  # split asteroids are this much faster than their parent
+ASTEROID_SPAWN_SPEED = (40, 100)  # px/s, new asteroids get a speed in this range
+ASTEROID_SPAWN_SPREAD = 30  # degrees off straight in from the edge
+ASTEROID_SPAWN_TABLE_SIZE = 4096  # spawns worth of random numbers generated at a time
 
 PLAYER_RADIUS = 20
 PLAYER_TURN_SPEED = 360
@@ -12,4 +37,93 @@ PLAYER_SPEED = 200
 PLAYER_SHOOT_SPEED = 500
 PLAYER_SHOOT_COOLDOWN = 0.3
 
-SHOT_RADIUS = 5
\ No newline at end of file
+SHOT_RADIUS = 5
+SHOT_LIFETIME = 3.0  # seconds, long enough to cross the whole screen
+
+# Shapes this far past any screen edge are removed. Asteroids spawn
+# ASTEROID_MAX_RADIUS off screen, so this has to be bigger than that
+OFFSCREEN_MARGIN = ASTEROID_MAX_RADIUS * 2
+OUTLINE_WIDTH = 2  # px, the quality governor thins this out under load
+
+# Particles (debris when asteroids split, exhaust when thrusting). Ranges are (min, max)
+PARTICLE_CAPACITY = 65536
+PARTICLE_DRAG = 1.5  # fraction of speed lost per second
+PARTICLE_FADE_LEVELS = 16  # brightness steps as particles die out
+PARTICLE_DEBRIS_PER_RADIUS = 1.5
+PARTICLE_DEBRIS_SPEED = (40, 220)
+PARTICLE_DEBRIS_LIFETIME = (0.4, 1.2)
+PARTICLE_DEBRIS_COLOR = (255, 255, 255)
+PARTICLE_THRUST_PER_TICK = 6
+PARTICLE_THRUST_SPEED = (60, 160)
+PARTICLE_THRUST_LIFETIME = (0.2, 0.5)
+PARTICLE_THRUST_SPREAD = 15  # degrees either side
+PARTICLE_THRUST_COLOR = (255, 170, 60)
+
+# Frame profiler: frames kept for percentiles, and how often the overlay text refreshes
+PROFILER_WINDOW = 300
+PROFILER_OVERLAY_REFRESH = 15
+
+# Quality governor: when the QUALITY_PERCENTILE frame time over QUALITY_WINDOW
+# frames goes over budget, drop a quality level. Step back up after
+# QUALITY_RECOVERY_WINDOWS windows in a row come in under QUALITY_HEADROOM of it
+QUALITY_GOVERNOR = True
+QUALITY_FRAME_BUDGET_MS = 1000 / 60
+QUALITY_WINDOW = 30
+QUALITY_PERCENTILE = 0.9
+QUALITY_HEADROOM = 0.6
+QUALITY_RECOVERY_WINDOWS = 4
+
+# High score table: how many to keep, and the database file (next to the game files)
+HIGH_SCORE_COUNT = 10
+HIGH_SCORE_DB = "high_scores.db"
+
+# Rewind: a snapshot every SNAPSHOT_INTERVAL ticks goes into a ring buffer that
+# never holds more than SNAPSHOT_BUFFER_BYTES (about 10s with 1k objects on screen)
+REWIND_ENABLED = True
+SNAPSHOT_INTERVAL = 1
+SNAPSHOT_BUFFER_BYTES = 32 * 1024 * 1024
+
+# Replays store a state checksum every this many ticks to catch divergence
+REPLAY_CHECKSUM_INTERVAL = 300
+
+# VecEnv (training environment): asteroids per observation, raster frame size
+# (width, height), and steps before an episode is cut off
+ENV_NEAREST_ASTEROIDS = 8
+ENV_RASTER_SIZE = (64, 36)
+ENV_MAX_EPISODE_STEPS = SIMULATION_RATE * 300
+
+# Networked multiplayer. The server simulates at SIMULATION_RATE and sends a
+# snapshot every NET_SNAPSHOT_INTERVAL ticks. Positions go over the wire in
+# 1/NET_POSITION_SCALE px, velocities in 1/NET_VELOCITY_SCALE px/s and
+# rotations in 1/65536ths of a turn
+NET_PORT = 47800
+NET_SNAPSHOT_INTERVAL = 3  # 20 snapshots per second at 60 ticks
+NET_POSITION_SCALE = 8
+NET_VELOCITY_SCALE = 64
+NET_CORRECTION_THRESHOLD = 0.5  # px a dead-reckoned object may drift before it's re-sent
+NET_BASELINE_WINDOW = SIMULATION_RATE * 2  # how old (in ticks) a delta baseline can be
+NET_INPUT_REDUNDANCY = 8  # inputs repeated in every input packet, covers lost packets
+NET_INTERPOLATION_DELAY = NET_SNAPSHOT_INTERVAL * 2  # ticks clients draw other objects behind the server
+NET_TIMEOUT = 5.0  # seconds of silence before a client is dropped
+
+# Collision broad phase. Cells must be at least as big as the largest combined
+# radius of two shapes, so twice the biggest asteroid is always safe.
+USE_SPATIAL_HASH = True
+SPATIAL_HASH_CELL_SIZE = ASTEROID_MAX_RADIUS * 2
+
+# Sweep shapes over each step and resolve hits in the order they happened,
+# instead of only checking overlaps at the end of it. Fast shots can't skip
+# through small asteroids then, even at low tick rates or on catch-up steps
+USE_SWEPT_COLLISIONS = True
+
+# Draw from pre-rendered sprites with one Surface.blits call per frame instead
+# of a pygame.draw call per object
+USE_SPRITE_ATLAS = True
+
+# Recycle dead shots and asteroids instead of allocating new ones
+USE_POOLING = True
+POOL_MAX_SIZE = 4096  # dead shapes kept per class
+
+# Opt-in numpy structure-of-arrays storage for asteroids and shots
+USE_ENTITY_STORE = False
+ENTITY_STORE_CAPACITY = 1024  # starting size, doubles when full
@@ -0,0 +1,165 @@
+# Regression checks for the deterministic simulation, exits with 1 if any fails:
+#   - the same seed and inputs end on the same state hash: run twice, drawn or
+#     not, pipelined, and with the entity store replaying the sprite run's inputs
+#   - a recorded game replays from its file matching every checksum and ends on
+#     the same state, and a tampered checksum gets caught
+#   - VecEnv stepping every game in one shared store matches giving each game
+#     its own store and stepping them one by one
+# Usage: python determinism_check.py [--frames 1200] [--seeds 1 2 3] [--waves waves_endurance.json]
+import argparse
+import os
+import sys
+import tempfile
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import numpy as np
+import pygame
+from constants import *
+from game import Game
+from policies import make_policy
+from replay import Replay, ReplayInput, ReplayRecorder
+from vecenv import VecEnv, NUM_ACTIONS
+from waves import WaveSchedule
+
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def play(seed, frames, waves, render=False, use_entity_store=False, pipelined=False, record=False):
+    """Play seed with the aim bot for up to frames ticks, returns the game"""
+    policy = make_policy("aim", seed)
+    recorder = ReplayRecorder(policy, seed, SIMULATION_RATE) if record else None
+    source = policy if recorder is None else recorder
+    game = Game(use_entity_store=use_entity_store, seed=seed, input_source=source, headless=True,
+                render=render, waves=waves)
+    policy.bind(game)
+    game.pipelined = pipelined
+    if recorder is not None:
+        recorder.replay.waves = waves
+        recorder.replay.swept_collisions = game.use_swept_collisions
+        game.tick_listeners.append(recorder)
+    game.run_headless(frames, 1 / SIMULATION_RATE)
+    if game.pipeline is not None:
+        game.pipeline.close()
+    return game
+
+
+def outcome(game):
+    return game.frame, game.score, game.state_hash()
+
+
+def check_runs(seed, frames, waves, directory):
+    recorded = play(seed, frames, waves, record=True)
+    reference = outcome(recorded)
+    variants = {
+        "again": {},
+        "rendered": {"render": True},
+        "pipelined": {"render": True, "pipelined": True},
+    }
+    failures = []
+    for name, options in variants.items():
+        if outcome(play(seed, frames, waves, **options)) != reference:
+            failures.append(name)
+    # The store moves asteroids before the player reads its input, sprites
+    # after, so the aim bot would see them a tick apart and play differently.
+    # The store run gets the sprite run's inputs instead
+    path = os.path.join(directory, f"runs_{seed}.replay")
+    recorded.input_source.save(path)
+    game, replay_input = replay_file(path, use_entity_store=True)
+    if outcome(game) != reference or replay_input.diverged_at is not None:
+        failures.append("entity store")
+    return not failures, f"frame {reference[0]}, score {reference[1]}" + (
+        f", differs: {', '.join(failures)}" if failures else "")
+
+
+def replay_file(path, use_entity_store=False):
+    replay = Replay.load(path)
+    replay_input = ReplayInput(replay)
+    game = Game(use_entity_store=use_entity_store, seed=replay.seed, input_source=replay_input, headless=True,
+                render=False, waves=replay.waves)
+    game.simulation_rate = replay.simulation_rate
+    game.use_swept_collisions = replay.swept_collisions
+    game.tick_listeners.append(replay_input)
+    game.run_headless(replay.ticks, 1 / replay.simulation_rate)
+    return game, replay_input
+
+
+def check_replay(seed, frames, waves, directory):
+    recorded = play(seed, frames, waves, record=True)
+    recorder = recorded.input_source
+    path = os.path.join(directory, f"check_{seed}.replay")
+    recorder.save(path)
+    game, replay_input = replay_file(path)
+    checksums = len(recorder.replay.checksums)
+    matched = (replay_input.diverged_at is None and replay_input.checked == checksums
+               and outcome(game) == outcome(recorded))
+
+    # the check has to be able to fail: flip one checksum and it must diverge there
+    tampered = Replay.load(path)
+    tick, checksum = tampered.checksums[-1]
+    tampered.checksums[-1] = (tick, checksum ^ 1)
+    tampered.save(path)
+    _, tampered_input = replay_file(path)
+    caught = tampered_input.diverged_at == tick
+    detail = f"{recorder.replay.ticks} ticks, {replay_input.checked}/{checksums} checksums, " \
+             f"tampered checksum {'caught' if caught else 'MISSED'}"
+    return matched and caught, detail
+
+
+def check_vecenv(seed, steps, num_envs=8):
+    shared = VecEnv(num_envs, seed=seed)
+    separate = VecEnv(num_envs, seed=seed, use_shared_store=False)
+    shared.reset()
+    separate.reset()
+    rng = np.random.default_rng(seed)
+    episodes = 0
+    for step in range(steps):
+        actions = rng.integers(0, NUM_ACTIONS, num_envs)
+        a = shared.step(actions)
+        b = separate.step(actions)
+        episodes += int(np.count_nonzero(a[2] | a[3]))
+        if not all(np.array_equal(x, y) for x, y in zip(a[:4], b[:4])):
+            return False, f"step {step}: observations or rewards differ"
+        differs = [i for i, (game_a, game_b) in enumerate(zip(shared.games, separate.games))
+                   if game_a.state_hash() != game_b.state_hash()]
+        if differs:
+            return False, f"step {step}: state hash differs for game {differs[0]}"
+    return True, f"{num_envs} games, {steps} steps, {episodes} episodes ended"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Determinism and replay regression checks")
+    parser.add_argument("--frames", type=int, default=1200)
+    parser.add_argument("--seeds", type=int, nargs="+", default=[1, 2, 3])
+    parser.add_argument("--waves", default=os.path.join(GAME_DIR, "waves_endurance.json"),
+                        help="wave script for the second round of checks, '' to skip it")
+    parser.add_argument("--vecenv-steps", type=int, default=600)
+    args = parser.parse_args()
+
+    pygame.init()
+    # Game prints a banner every time it starts
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, "w")
+    results = []
+    scripts = [("classic", None)]
+    if args.waves:
+        scripts.append((os.path.basename(args.waves), WaveSchedule.load(args.waves)))
+    with tempfile.TemporaryDirectory() as directory:
+        for label, waves in scripts:
+            for seed in args.seeds:
+                results.append((f"same hash, seed {seed}, {label}", *check_runs(seed, args.frames, waves, directory)))
+                results.append((f"replay, seed {seed}, {label}", *check_replay(seed, args.frames, waves, directory)))
+    for seed in args.seeds[:1]:
+        results.append((f"vecenv shared store, seed {seed}", *check_vecenv(seed, args.vecenv_steps)))
+    sys.stdout = stdout
+    pygame.quit()
+
+    for name, ok, detail in results:
+        print(f"{'ok  ' if ok else 'FAIL'} {name}: {detail}")
+    failed = sum(not ok for _, ok, _ in results)
+    print(f"{len(results) - failed}/{len(results)} checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
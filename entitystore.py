@@ -0,0 +1,336 @@
+import numpy as np
+import pygame
+from constants import *
+from asteroid import Asteroid
+from shots import Shot
+
+KIND_ASTEROID = 0
+KIND_SHOT = 1
+
+
+def times_of_impact(start_a, end_a, start_b, end_b, reach):
+    """Array version of circleshape.time_of_impact, with inf where there's no hit"""
+    # written out per component so the numbers come out exactly like the sprite version
+    offset_x = start_a[:, 0] - start_b[:, 0]
+    offset_y = start_a[:, 1] - start_b[:, 1]
+    c = offset_x * offset_x + offset_y * offset_y - reach * reach
+    motion_x = (end_a[:, 0] - start_a[:, 0]) - (end_b[:, 0] - start_b[:, 0])
+    motion_y = (end_a[:, 1] - start_a[:, 1]) - (end_b[:, 1] - start_b[:, 1])
+    a = motion_x * motion_x + motion_y * motion_y
+    b = offset_x * motion_x + offset_y * motion_y
+    discriminant = b * b - a * c
+    approaching = (a != 0) & (b < 0) & (discriminant >= 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t = (-b - np.sqrt(np.where(approaching, discriminant, 0.0))) / np.where(approaching, a, 1.0)
+    t = np.where(approaching & (t <= 1.0), t, np.inf)
+    return np.where(c < 0, 0.0, t)
+
+
+def cell_keys(cell_x, cell_y, owners=0):
+    # pack a (possibly negative) grid cell into one sortable int64, with the
+    # owning game on top so different games' shapes never share a cell
+    return owners * (1 << 42) + (cell_x + (1 << 20)) * (1 << 21) + (cell_y + (1 << 20))
+
+
+# Structure-of-arrays storage for asteroids and shots.
+# Instead of every sprite holding its own Vector2s, positions, velocities, radii
+# etc. live in contiguous numpy arrays indexed by slot. Moving everything is then
+# one array operation per frame, and collision tests run on whole arrays at once.
+# Several games can share one store (VecEnv does): every slot records the game
+# that owns it, and the methods taking an owner only look at that game's slots.
+class EntityStore:
+    def __init__(self, capacity=ENTITY_STORE_CAPACITY):
+        self.capacity = 0
+        self.positions = np.zeros((0, 2))
+        self.previous_positions = np.zeros((0, 2))
+        self.velocities = np.zeros((0, 2))
+        self.radii = np.zeros(0)
+        self.ages = np.zeros(0)
+        self.ttls = np.zeros(0)
+        self.margins = np.zeros(0)
+        self.kinds = np.zeros(0, dtype=np.int8)
+        self.alive = np.zeros(0, dtype=bool)
+        # allocation order, which is also the order views were added to their groups
+        self.serials = np.zeros(0, dtype=np.int64)
+        self.owners = np.zeros(0, dtype=np.int64)
+        self.owner = 0  # owner of newly allocated slots, Game.activate sets it
+        self.views = []
+        self.free_slots = []
+        # killed slots are only handed out again after recycle(), so a view that
+        # was just killed (e.g. in Asteroid.split) can still read its own state
+        self.pending_free = []
+        # slots at or above this have never been used, so per-frame work stops here
+        self.high_water = 0
+        self.next_serial = 0
+        self.grow(capacity)
+
+    def grow(self, capacity):
+        extra = capacity - self.capacity
+        if extra <= 0:
+            return
+        self.positions = np.concatenate([self.positions, np.zeros((extra, 2))])
+        self.previous_positions = np.concatenate([self.previous_positions, np.zeros((extra, 2))])
+        self.velocities = np.concatenate([self.velocities, np.zeros((extra, 2))])
+        self.radii = np.concatenate([self.radii, np.zeros(extra)])
+        self.ages = np.concatenate([self.ages, np.zeros(extra)])
+        self.ttls = np.concatenate([self.ttls, np.full(extra, np.inf)])
+        self.margins = np.concatenate([self.margins, np.full(extra, np.inf)])
+        self.kinds = np.concatenate([self.kinds, np.zeros(extra, dtype=np.int8)])
+        self.alive = np.concatenate([self.alive, np.zeros(extra, dtype=bool)])
+        self.serials = np.concatenate([self.serials, np.zeros(extra, dtype=np.int64)])
+        self.owners = np.concatenate([self.owners, np.zeros(extra, dtype=np.int64)])
+        self.views.extend([None] * extra)
+        # pop() takes from the end, so keep the lowest slots there
+        self.free_slots = list(range(capacity - 1, self.capacity - 1, -1)) + self.free_slots
+        self.capacity = capacity
+
+    def allocate(self, view, kind):
+        if not self.free_slots:
+            self.grow(self.capacity * 2)
+        slot = self.free_slots.pop()
+        self.kinds[slot] = kind
+        self.alive[slot] = True
+        self.ttls[slot] = np.inf if view.ttl is None else view.ttl
+        self.margins[slot] = np.inf if view.offscreen_margin is None else view.offscreen_margin
+        self.serials[slot] = self.next_serial
+        self.next_serial += 1
+        self.owners[slot] = self.owner
+        self.views[slot] = view
+        self.high_water = max(self.high_water, slot + 1)
+        return slot
+
+    def release(self, view):
+        # a stale view must not free a slot that has since been handed to someone else
+        slot = view.slot
+        if self.alive[slot] and self.views[slot] is view:
+            self.alive[slot] = False
+            self.pending_free.append(slot)
+
+    def recycle(self):
+        for slot in self.pending_free:
+            self.velocities[slot] = 0
+            self.views[slot] = None
+            self.free_slots.append(slot)
+        self.pending_free.clear()
+
+    def clear(self, owner=None):
+        if owner is not None:
+            # just one game's shapes, the others sharing the store carry on
+            slots = np.flatnonzero(self.alive[:self.high_water] & (self.owners[:self.high_water] == owner))
+            self.alive[slots] = False
+            self.velocities[slots] = 0
+            for slot in slots.tolist():
+                self.views[slot] = None
+            self.free_slots.extend(slots[::-1].tolist())
+            return
+        self.alive[:] = False
+        self.velocities[:] = 0
+        self.views = [None] * self.capacity
+        self.free_slots = list(range(self.capacity - 1, -1, -1))
+        self.pending_free.clear()
+        self.high_water = 0
+
+    def save_previous_state(self):
+        n = self.high_water
+        self.previous_positions[:n] = self.positions[:n]
+
+    def update(self, dt):
+        # dead slots have zero velocity once recycled, so no need to mask them out
+        n = self.high_water
+        self.positions[:n] += self.velocities[:n] * dt
+        self.ages[:n] += dt
+
+    def live_slots(self, kind, owner=None):
+        n = self.high_water
+        live = self.alive[:n] & (self.kinds[:n] == kind)
+        if owner is not None:
+            live &= self.owners[:n] == owner
+        return np.flatnonzero(live)
+
+    def find_overlaps(self, kind_a, kind_b, cell_size=SPATIAL_HASH_CELL_SIZE, swept=False, owner=None):
+        """Return (slots_a, slots_b) arrays of overlapping pairs, in group order.
+
+        swept checks over the whole step (from previous_positions) instead, and
+        orders the pairs by time of impact first. Only shapes of the same owner
+        pair up; owner limits it to that one game.
+        """
+        a = self.live_slots(kind_a, owner)
+        b = self.live_slots(kind_b, owner)
+        if len(a) == 0 or len(b) == 0:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+        if swept:
+            # grow the cells by the furthest anything moved, so the 3x3 block
+            # around where a shape ended up still reaches everything it swept past
+            travel = self.positions - self.previous_positions
+            travel_a = np.sqrt(np.einsum("ij,ij->i", travel[a], travel[a])).max()
+            travel_b = np.sqrt(np.einsum("ij,ij->i", travel[b], travel[b])).max()
+            cell_size = cell_size + travel_a + travel_b
+
+        # Vectorized version of the spatial hash: sort kind_b by grid cell, then
+        # for each of the 9 neighbouring cells look up the matching run of kind_b
+        # with searchsorted and expand the runs into candidate pairs
+        cells_a = np.floor(self.positions[a] / cell_size).astype(np.int64)
+        cells_b = np.floor(self.positions[b] / cell_size).astype(np.int64)
+        owners_a = self.owners[a]
+        keys_b = cell_keys(cells_b[:, 0], cells_b[:, 1], self.owners[b])
+        order_b = np.argsort(keys_b, kind="stable")
+        sorted_keys_b = keys_b[order_b]
+
+        rows = []
+        cols = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = cell_keys(cells_a[:, 0] + dx, cells_a[:, 1] + dy, owners_a)
+                low = np.searchsorted(sorted_keys_b, keys, side="left")
+                high = np.searchsorted(sorted_keys_b, keys, side="right")
+                counts = high - low
+                total = int(counts.sum())
+                if total == 0:
+                    continue
+                starts = np.repeat(low - (np.cumsum(counts) - counts), counts)
+                rows.append(np.repeat(np.arange(len(a)), counts))
+                cols.append(order_b[starts + np.arange(total)])
+        if not rows:
+            return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+
+        slots_a = a[np.concatenate(rows)]
+        slots_b = b[np.concatenate(cols)]
+        if swept:
+            t = times_of_impact(self.previous_positions[slots_a], self.positions[slots_a],
+                                self.previous_positions[slots_b], self.positions[slots_b],
+                                self.radii[slots_a] + self.radii[slots_b])
+            hit = t <= 1.0
+            slots_a = slots_a[hit]
+            slots_b = slots_b[hit]
+            order = np.lexsort((self.serials[slots_b], self.serials[slots_a], t[hit]))
+            return slots_a[order], slots_b[order]
+        # narrow phase on just the candidates
+        delta = self.positions[slots_a] - self.positions[slots_b]
+        reach = self.radii[slots_a] + self.radii[slots_b]
+        hit = reach * reach > np.einsum("ij,ij->i", delta, delta)
+        slots_a = slots_a[hit]
+        slots_b = slots_b[hit]
+        order = np.lexsort((self.serials[slots_b], self.serials[slots_a]))
+        return slots_a[order], slots_b[order]
+
+    def any_overlap(self, position, radius, kind, start=None, owner=None):
+        # start: where the circle began the step, to sweep it (and the shapes) over the step
+        slots = self.live_slots(kind, owner)
+        if len(slots) == 0:
+            return False
+        if start is not None:
+            count = len(slots)
+            t = times_of_impact(self.previous_positions[slots], self.positions[slots],
+                                np.tile((start.x, start.y), (count, 1)), np.tile((position.x, position.y), (count, 1)),
+                                self.radii[slots] + radius)
+            return bool(np.any(t <= 1.0))
+        delta = self.positions[slots] - (position.x, position.y)
+        reach = self.radii[slots] + radius
+        return bool(np.any(reach * reach > np.einsum("ij,ij->i", delta, delta)))
+
+    def overlaps_by_owner(self, positions, radii, kind, starts=None):
+        """any_overlap for one circle per owner at once (rows of positions and
+        radii, indexed by owner), as a bool array by owner"""
+        slots = self.live_slots(kind)
+        hit = np.zeros(len(positions), dtype=bool)
+        if len(slots) == 0:
+            return hit
+        owners = self.owners[slots]
+        reach = self.radii[slots] + radii[owners]
+        if starts is not None:
+            t = times_of_impact(self.previous_positions[slots], self.positions[slots],
+                                starts[owners], positions[owners], reach)
+            touching = t <= 1.0
+        else:
+            delta = self.positions[slots] - positions[owners]
+            touching = reach * reach > np.einsum("ij,ij->i", delta, delta)
+        hit[owners[touching]] = True
+        return hit
+
+    def expired_views(self, owner=None):
+        n = self.high_water
+        x = self.positions[:n, 0]
+        y = self.positions[:n, 1]
+        margins = self.margins[:n]
+        expired = self.alive[:n] & (
+            (self.ages[:n] >= self.ttls[:n])
+            | (x < -margins)
+            | (x > SCREEN_WIDTH + margins)
+            | (y < -margins)
+            | (y > SCREEN_HEIGHT + margins)
+        )
+        if owner is not None:
+            expired &= self.owners[:n] == owner
+        return [self.views[slot] for slot in np.flatnonzero(expired)]
+
+
+# Mixin that swaps a shape's own attributes for properties reading and writing
+# its slot in the store. Vectors come back as copies, so always assign them
+# (position += ..., velocity = ...) rather than mutating x/y in place.
+class StoredShape:
+    # store new views get their slot in, Game.activate sets it like containers.
+    # Each view keeps its own store after that, so it reads its own game's
+    # arrays whichever game is active later
+    new_store = None
+    # the store recycles slots itself, so stored shapes never go through a ShapePool
+    pool = None
+
+    def __init__(self, *args):
+        self.store = self.new_store
+        self.slot = self.store.allocate(self, self.kind)
+        super().__init__(*args)
+
+    @property
+    def position(self):
+        return pygame.Vector2(*self.store.positions[self.slot])
+
+    @position.setter
+    def position(self, value):
+        self.store.positions[self.slot] = (value[0], value[1])
+
+    @property
+    def previous_position(self):
+        return pygame.Vector2(*self.store.previous_positions[self.slot])
+
+    @previous_position.setter
+    def previous_position(self, value):
+        self.store.previous_positions[self.slot] = (value[0], value[1])
+
+    @property
+    def velocity(self):
+        return pygame.Vector2(*self.store.velocities[self.slot])
+
+    @velocity.setter
+    def velocity(self, value):
+        self.store.velocities[self.slot] = (value[0], value[1])
+
+    @property
+    def radius(self):
+        return float(self.store.radii[self.slot])
+
+    @radius.setter
+    def radius(self, value):
+        self.store.radii[self.slot] = value
+
+    @property
+    def age(self):
+        return float(self.store.ages[self.slot])
+
+    @age.setter
+    def age(self, value):
+        self.store.ages[self.slot] = value
+
+    def update(self, dt):
+        # EntityStore.update moves every stored shape in one go
+        pass
+
+    def release(self):
+        self.store.release(self)
+
+
+class AsteroidView(StoredShape, Asteroid):
+    kind = KIND_ASTEROID
+
+
+class ShotView(StoredShape, Shot):
+    kind = KIND_SHOT
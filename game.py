@@ -1,30 +1,153 @@
 import pygame
-import json
+import os
+import random
+import struct
+import hashlib
+import sys
+import time
 from constants import *
 from player import Player
 from asteroid import Asteroid
 from asteroidfield import AsteroidField
 from shots import Shot
+from spatialhash import SpatialHash
+from entitystore import EntityStore, StoredShape, AsteroidView, ShotView, KIND_ASTEROID, KIND_SHOT
+from inputsource import KeyboardInput
+from textcache import TextCache
+from spriteatlas import SpriteAtlas
+from circleshape import CircleShape, time_of_impact
+from pool import ShapePool
+from profiler import FrameProfiler
+from particles import ParticleSystem
+from quality import QualityGovernor, QUALITY_LEVELS
+from scorestore import MemoryScoreStore, SQLiteScoreStore
+from snapshot import SnapshotRing, save_state, restore_state
+from pipeline import RenderFrame, SimulationPipeline
+
+def use_dummy_video_driver():
+    # the driver can only be switched while the display module is shut down
+    if os.environ.get("SDL_VIDEODRIVER") != "dummy":
+        pygame.display.quit()
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+    pygame.display.init()
+
 
 class Game:
-    def __init__(self):
+    def __init__(self, use_entity_store=USE_ENTITY_STORE, seed=None, input_source=None,
+                 headless=False, render=True, profile_path=None, score_store=None,
+                 window_size=(WINDOW_WIDTH, WINDOW_HEIGHT), waves=None):
         print("Starting Asteroids!")
         print(f"Screen width: {SCREEN_WIDTH}")
         print(f"Screen height: {SCREEN_HEIGHT}")
         
-        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-        self.game_state = "title_screen"
+        # Headless mode runs on SDL's dummy video driver so no window (or display
+        # server) is needed. With render off we skip drawing entirely
+        self.headless = headless
+        self.render = render
+        if headless:
+            use_dummy_video_driver()
+        if render:
+            self.screen = pygame.display.set_mode(window_size)
+        else:
+            self.screen = pygame.Surface(window_size)
+        # menus and the HUD are laid out in window pixels, the game itself in world units
+        self.window_width, self.window_height = self.screen.get_size()
+        self.game_state = "playing" if headless else "title_screen"
+        self.text_cache = TextCache()
+        # Per-phase frame timings. F3 toggles the overlay, profile_path streams
+        # one record per frame to a .jsonl or .csv file
+        self.profiler = FrameProfiler(output_path=profile_path)
+        self.splits_before_frame = Asteroid.split_count
+        # Every asteroid size, the shot and all ship rotations drawn up front
+        self.use_sprite_atlas = USE_SPRITE_ATLAS
+        self.sprite_atlas = None
+        self.sprite_atlases = {}  # by (outline width, scale), see configure_view
+        self.static_screen_key = None # What the menu currently on screen shows
         self.game_clock = pygame.time.Clock()
         self.dt = 0
+        # Fixed-step loop: real time piles up in the accumulator and is used up in
+        # steps of 1/simulation_rate. What's left over decides how far between the
+        # last two steps we draw
+        self.simulation_rate = SIMULATION_RATE
+        self.max_catchup_steps = MAX_CATCHUP_STEPS
+        self.render_fps = RENDER_FPS
+        self.accumulator = 0.0
+        # headless runs draw exactly what was simulated, so skip the bookkeeping
+        self.interpolate = INTERPOLATE_RENDERING and not headless
+        # Simulate the next frame on a worker thread while the main thread draws
+        # the last one. Only does anything with rendering on
+        self.pipelined = PIPELINED_SIMULATION
+        self.pipeline = None  # the SimulationPipeline, started on first use
         self.score = 0
+        self.culled_count = 0 # Total shapes removed for leaving the screen or expiring
+        self.frame = 0 # Simulation ticks since the game (re)started
+        # Objects with an on_tick(game) method, called after every simulation step
+        self.tick_listeners = []
+
+        # Everything random in the game comes from this, so a seed makes a run repeatable
+        self.seed = seed
+        self.rng = random.Random(seed)
+        # How asteroids come in (a waves.WaveSchedule), None for the classic steady trickle
+        self.waves = waves
+        # Where the player's controls come from (keyboard unless told otherwise)
+        self.input_source = input_source if input_source is not None else KeyboardInput()
 
         self.player_name = "" # Add this to store the current input
         self.input_active = False # Flag for the input box being active
 
         # High scores list - will hold tuples of (name, score)
+        # Headless runs keep scores in memory so they never touch the real table
+        if score_store is None:
+            score_store = MemoryScoreStore() if headless else SQLiteScoreStore()
+        self.score_store = score_store
         self.high_scores = []
         self.load_high_scores()  # Load high scores when starting
         
+        # Broad phase for shot/asteroid collisions. Flip use_spatial_hash off to
+        # fall back to checking every pair (handy for cross-checking the grid)
+        self.use_spatial_hash = USE_SPATIAL_HASH
+        self.shot_grid = SpatialHash(SPATIAL_HASH_CELL_SIZE)
+        # Sweep shapes from where they were at the start of the step (their
+        # previous_position) instead of only testing where they ended up
+        self.use_swept_collisions = USE_SWEPT_COLLISIONS
+
+        # Optionally keep asteroids and shots in numpy arrays so they can be
+        # moved and collided in bulk instead of one sprite at a time
+        self.use_entity_store = use_entity_store
+        self.entity_store = EntityStore() if use_entity_store else None
+        # which game this is in a store shared with others (see share_store), None when it's ours alone
+        self.store_owner = None
+
+        # Reuse dead shots and asteroids rather than allocating new ones
+        self.use_pooling = USE_POOLING
+        self.pools = [ShapePool(Asteroid), ShapePool(Shot)] if self.use_pooling else []
+        # Shapes constructed and net memory blocks allocated during the last update
+        self.frame_allocations = 0
+        self.frame_allocated_blocks = 0
+
+        # Debris and exhaust, only worth simulating if someone will see them
+        self.particles = ParticleSystem(seed=seed) if render else None
+
+        # Rewind and quick-save (F5 save, F9 load, hold R to rewind). Headless
+        # runs don't need it, and recordings turn it off since it rewrites history
+        self.snapshots_enabled = REWIND_ENABLED and not headless
+        self.snapshot_interval = SNAPSHOT_INTERVAL
+        self.rewind_buffer = SnapshotRing()
+        self.quick_save = None
+
+        # Drops drawing detail when frames run over budget (see quality.py).
+        # Headless runs aren't watched by anyone, so they always draw in full
+        self.quality = QualityGovernor() if QUALITY_GOVERNOR and not headless else None
+        self.quality_settings = QUALITY_LEVELS[0]
+        self.frames_drawn = 0
+        self.hud_score = None  # the score the HUD shows, refreshed every hud_interval frames
+
+        # The world is drawn into world_surface at render_scale times the
+        # window's resolution, then scaled into view (the part of the window
+        # the playfield fits in). At a scale of 1 that's the window itself
+        self.render_scale = RENDER_SCALE
+        self.configure_view()
+
         self.setup_sprite_groups()
         self.create_game_objects()
         
@@ -33,20 +156,106 @@ class Game:
         self.drawable = pygame.sprite.Group()
         self.asteroids = pygame.sprite.Group()
         self.shots = pygame.sprite.Group()
-        
+        self.activate()
+
+    def activate(self):
+        """Point the class-level hooks (containers, rng, input, pools) at this game"""
+        # Only needed when several Games live in one process, e.g. VecEnv: call
+        # it before stepping or resetting a game so new shapes land in its groups
         Player.containers = (self.updatable, self.drawable)
         Asteroid.containers = (self.asteroids, self.updatable, self.drawable)
         AsteroidField.containers = (self.updatable)
         Shot.containers = (self.shots, self.updatable, self.drawable)
+        Player.input_source = self.input_source
+        Asteroid.rng = self.rng
+        AsteroidField.rng = self.rng
+        AsteroidField.asteroids = self.asteroids
+        Asteroid.particles = self.particles
+        Player.particles = self.particles
+        CircleShape.outline_width = self.sprite_atlas.outline_width
+        CircleShape.draw_scale = self.draw_scale
+        Shot.dots = self.quality_settings.shot_dots
+        for pool in self.pools:
+            pool.cls.pool = pool
+        if not self.use_pooling:
+            Asteroid.pool = None
+            Shot.pool = None
+
+        if self.use_entity_store:
+            # stored shapes are moved by the store, so they stay out of updatable
+            StoredShape.new_store = self.entity_store
+            self.entity_store.owner = 0 if self.store_owner is None else self.store_owner
+            AsteroidView.containers = (self.asteroids, self.drawable)
+            ShotView.containers = (self.shots, self.drawable)
+            AsteroidField.asteroid_class = AsteroidView
+            Player.shot_class = ShotView
+        else:
+            AsteroidField.asteroid_class = Asteroid
+            Player.shot_class = Shot
     
+    def share_store(self, store, owner):
+        """Keep this game's asteroids and shots in store, tagged with owner, next to other games'.
+
+        The store then moves and collides them for all its games at once, so a
+        game sharing one is stepped through VecEnv.step_games, not step()
+        """
+        self.entity_store = store
+        self.store_owner = owner
+        self.activate()
+
+    def configure_view(self):
+        """(Re)build the surfaces and atlas the world is drawn with"""
+        screen_rect = self.screen.get_rect()
+        fit = min(screen_rect.width / SCREEN_WIDTH, screen_rect.height / SCREEN_HEIGHT)
+        view_rect = pygame.Rect(0, 0, round(SCREEN_WIDTH * fit), round(SCREEN_HEIGHT * fit))
+        view_rect.center = screen_rect.center
+        self.view = self.screen if view_rect == screen_rect else self.screen.subsurface(view_rect)
+
+        scale = self.render_scale * self.quality_settings.render_scale
+        world_size = (max(1, round(view_rect.width * scale)), max(1, round(view_rect.height * scale)))
+        if world_size == view_rect.size:
+            self.world_surface = self.view
+        else:
+            # same pixel format as the window, so scaling into it is a straight copy
+            self.world_surface = pygame.Surface(world_size, 0, self.screen)
+        self.draw_scale = world_size[0] / SCREEN_WIDTH
+
+        # outlines keep their width on screen whatever the internal resolution
+        outline_width = max(1, round(self.quality_settings.outline_width * self.draw_scale / fit))
+        key = (outline_width, self.draw_scale)
+        atlas = self.sprite_atlases.get(key)
+        if atlas is None:
+            atlas = self.sprite_atlases[key] = SpriteAtlas(outline_width, self.draw_scale)
+        self.sprite_atlas = atlas
+
+    def set_render_scale(self, scale):
+        """Draw the world at scale times the window's resolution"""
+        self.render_scale = scale
+        self.apply_quality(self.quality_settings)
+
+    def apply_quality(self, settings):
+        """Draw with this QualityLevel from the next frame on"""
+        self.quality_settings = settings
+        self.configure_view()
+        if self.particles is not None:
+            self.particles.fraction = settings.particle_fraction
+        self.hud_score = None
+        self.activate()
+
     def create_game_objects(self):
         self.player = Player(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
-        self.asteroid_field = AsteroidField()
+        self.asteroid_field = AsteroidField(self.waves)
     
     def handle_events(self):
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 return False
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_F3:
+                self.profiler.toggle_overlay()
+                continue
+            # The window got covered/restored, so menus have to be drawn again
+            if event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                self.static_screen_key = None
             # Check for key presses on title screen
             if self.game_state == "title_screen":
                 if event.type == pygame.KEYDOWN:
@@ -91,24 +300,40 @@ class Game:
                     # Without the pygame.KEYDOWN check, pressing anything other than R or Q in the game over screen crashes
                        
             else: # When the game is in the 'playing' state. Might change if I add more game states
-                pass
+                if event.type == pygame.KEYDOWN and self.snapshots_enabled:
+                    if event.key == pygame.K_F5:
+                        self.quick_save = save_state(self)
+                    elif event.key == pygame.K_F9 and self.quick_save is not None:
+                        restore_state(self, self.quick_save)
+                        # whatever was in the buffer happened after the save
+                        self.rewind_buffer.clear()
 
         # Ensures the game keeps running unless QUIT event is triggered
         return True
     
+    def static_screen_changed(self, key):
+        """True if a menu screen with this content key needs (re)drawing"""
+        # Menu screens don't animate, so once drawn and flipped they stay on the
+        # display until their content changes or the window needs repainting
+        if key == self.static_screen_key:
+            return False
+        self.static_screen_key = key
+        return True
+
     def draw_title_screen(self):
+        if not self.static_screen_changed(("title_screen",)):
+            return
+
         # Clear the screen
         self.screen.fill((0, 0, 0))  # Black background
         
         # Render title
-        title_font = pygame.font.Font(None, 74)
-        title_text = title_font.render("ASTEROIDS", True, (255, 255, 255))
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
+        title_text = self.text_cache.render("ASTEROIDS", 74, (255, 255, 255))
+        title_rect = title_text.get_rect(center=(self.window_width//2, self.window_height//3))
         
         # Render "Press any key" message
-        prompt_font = pygame.font.Font(None, 36)
-        prompt_text = prompt_font.render("Press Any Key to Start", True, (200, 200, 200))
-        prompt_rect = prompt_text.get_rect(center=(SCREEN_WIDTH//2, 2*SCREEN_HEIGHT//3))
+        prompt_text = self.text_cache.render("Press Any Key to Start", 36, (200, 200, 200))
+        prompt_rect = prompt_text.get_rect(center=(self.window_width//2, 2*self.window_height//3))
         
         # Draw texts
         self.screen.blit(title_text, title_rect)
@@ -118,23 +343,22 @@ class Game:
         pygame.display.flip()
     
     def draw_game_over(self):
+        if not self.static_screen_changed(("game_over", self.score)):
+            return
+
         self.screen.fill((0, 0, 0))  # Black background
         
         # Render "Game Over" message
-        font = pygame.font.Font(None, 74)
-        text = font.render("GAME OVER", True, (255, 0, 0))
-        text_rect = text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//3))
+        text = self.text_cache.render("GAME OVER", 74, (255, 0, 0))
+        text_rect = text.get_rect(center=(self.window_width//2, self.window_height//3))
         
         # Render score
-        score_font = pygame.font.Font(None, 36)
-        score_text = score_font.render(f"Final Score: {self.score}", True, (255, 255, 255))
-        score_rect = score_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT//2))
+        score_text = self.text_cache.render(f"Final Score: {self.score}", 36, (255, 255, 255))
+        score_rect = score_text.get_rect(center=(self.window_width//2, self.window_height//2))
         
         # Prompt to move to High Score screen
-        prompt_font = pygame.font.Font(None, 36)
-        prompt_text = prompt_font.render("Press SPACE to return", True, (200, 200, 200))
-        prompt_rect = prompt_text.get_rect(center=(SCREEN_WIDTH//2, SCREEN_HEIGHT - 100))
-        self.screen.blit(prompt_text, prompt_rect)
+        prompt_text = self.text_cache.render("Press SPACE to return", 36, (200, 200, 200))
+        prompt_rect = prompt_text.get_rect(center=(self.window_width//2, self.window_height - 100))
     
         # Draw texts
         self.screen.blit(text, text_rect)
@@ -145,65 +369,65 @@ class Game:
         pygame.display.flip()
 
     def draw_enter_name(self):
+        if not self.static_screen_changed(("enter_name", self.score, self.player_name)):
+            return
+
         # Draw the background
         self.screen.fill((0, 0, 0))
         
         # Draw title
-        font = pygame.font.Font(None, 74)
-        title_text = font.render("New High Score!", True, "white")
-        title_rect = title_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 4))
+        title_text = self.text_cache.render("New High Score!", 74, "white")
+        title_rect = title_text.get_rect(center=(self.window_width // 2, self.window_height // 4))
         self.screen.blit(title_text, title_rect)
         
         # Draw score
-        score_text = font.render(f"Score: {self.score}", True, "white")
-        score_rect = score_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3))
+        score_text = self.text_cache.render(f"Score: {self.score}", 74, "white")
+        score_rect = score_text.get_rect(center=(self.window_width // 2, self.window_height // 3))
         self.screen.blit(score_text, score_rect)
         
         # Draw input box
-        input_box = pygame.Rect(SCREEN_WIDTH // 4, SCREEN_HEIGHT // 2, SCREEN_WIDTH // 2, 50)
+        input_box = pygame.Rect(self.window_width // 4, self.window_height // 2, self.window_width // 2, 50)
         pygame.draw.rect(self.screen, "white", input_box, 2)
 
         # Draw the current input text
-        font = pygame.font.Font(None, 32)
-        input_text = font.render(self.player_name, True, "white")
+        input_text = self.text_cache.render(self.player_name, 32, "white")
         input_rect = input_text.get_rect(center=(input_box.centerx, input_box.centery))
         self.screen.blit(input_text, input_rect)
         
         # Optional: Add instructions
-        instruction_font = pygame.font.Font(None, 26)
-        instruction_text = instruction_font.render("Type your name and press Enter", True, "white")
-        instruction_rect = instruction_text.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2 + 60))
+        instruction_text = self.text_cache.render("Type your name and press Enter", 26, "white")
+        instruction_rect = instruction_text.get_rect(center=(self.window_width // 2, self.window_height // 2 + 60))
         self.screen.blit(instruction_text, instruction_rect)
 
         # Don't forget to update the display
         pygame.display.flip()
     
     def draw_high_scores(self):
+        top_scores = [(name, score) for name, score in self.high_scores[:10]]  # Show top 10
+        if not self.static_screen_changed(("high_scores", tuple(top_scores))):
+            return
+
         self.screen.fill((0, 0, 0))  # Black background
         
         # Title
-        font = pygame.font.Font(None, 74)
-        title = font.render("HIGH SCORES", True, (255, 215, 0))  # Gold color
-        title_rect = title.get_rect(center=(SCREEN_WIDTH//2, 100))
+        title = self.text_cache.render("HIGH SCORES", 74, (255, 215, 0))  # Gold color
+        title_rect = title.get_rect(center=(self.window_width//2, 100))
         self.screen.blit(title, title_rect)
         
         # Display scores
-        score_font = pygame.font.Font(None, 36)
         y_position = 200
         
-        for i, (name, score) in enumerate(self.high_scores[:10]):  # Show top 10
-            text = score_font.render(f"{i+1}. {name}: {score}", True, (255, 255, 255))
-            text_rect = text.get_rect(center=(SCREEN_WIDTH//2, y_position))
+        for i, (name, score) in enumerate(top_scores):
+            text = self.text_cache.render(f"{i+1}. {name}: {score}", 36, (255, 255, 255))
+            text_rect = text.get_rect(center=(self.window_width//2, y_position))
             self.screen.blit(text, text_rect)
             y_position += 50
         
         # Render "Press R to restart" message
-        prompt_font = pygame.font.Font(None, 36)
-        prompt_text = prompt_font.render("Press R to Restart or Q to Quit", True, (200, 200, 200))
-        prompt_rect = prompt_text.get_rect(center=(SCREEN_WIDTH//2, 2*SCREEN_HEIGHT//3))
+        prompt_text = self.text_cache.render("Press R to Restart or Q to Quit", 36, (200, 200, 200))
+        prompt_rect = prompt_text.get_rect(center=(self.window_width//2, 2*self.window_height//3))
 
         # Draw texts
-        self.screen.blit(text, text_rect)
         self.screen.blit(prompt_text, prompt_rect)
 
         pygame.display.flip()
@@ -211,12 +435,23 @@ class Game:
     def reset_game(self):
         # Reset score
         self.score = 0
+        self.hud_score = None
+        self.culled_count = 0
+        self.frame = 0
+        self.accumulator = 0.0
         
         # Clear all sprite groups
         self.updatable.empty()
         self.drawable.empty()
         self.asteroids.empty()
         self.shots.empty()
+        if self.entity_store is not None:
+            self.entity_store.clear(self.store_owner)
+        for pool in self.pools:
+            pool.clear()
+        self.rewind_buffer.clear()
+        if self.particles is not None:
+            self.particles.clear()
         
         # Recreate player and asteroid field
         self.create_game_objects()
@@ -230,16 +465,12 @@ class Game:
             return 200  # Large asteroids
 
     def load_high_scores(self):
-        try:
-            with open("high_scores.json", "r") as file:
-                self.high_scores = json.loads(file.read())
-        except (FileNotFoundError, json.JSONDecodeError):
-            # If file doesn't exist or is invalid, start with empty list
-            self.high_scores = []
+        # The store keeps the top scores in memory, this is just a copy for drawing
+        self.high_scores = self.score_store.top()
 
     def save_high_scores(self):
-        with open("high_scores.json", "w") as file:
-            json.dump(self.high_scores, file)
+        # Writes already happen in the background, this waits for them to land
+        self.score_store.flush()
 
     def check_high_score(self, score):
         """Check if current score is a high score"""
@@ -248,9 +479,7 @@ class Game:
             return False
         
         # If we have fewer than 10 scores, or this score beats the lowest one
-        if len(self.high_scores) < 10 or score > self.high_scores[-1][1]:
-            return True
-        return False
+        return self.score_store.qualifies(score)
 
     def add_high_score(self, name, score):
         """Add a new high score to the list"""
@@ -258,17 +487,105 @@ class Game:
         if score == 0:
             return
 
-        self.high_scores.append((name, score))
-        # Sort high scores by score value (descending)
-        self.high_scores.sort(key=lambda x: x[1], reverse=True)
-        # Keep only top 10
-        self.high_scores = self.high_scores = self.high_scores[:10]
-        self.save_high_scores()
+        # Goes into the in-memory top 10 right away, the disk write happens in the background
+        self.score_store.add(name, score)
+        self.high_scores = self.score_store.top()
     
     def update(self):
-        self.updatable.update(self.dt)
+        allocations_before = CircleShape.allocations
+        blocks_before = sys.getallocatedblocks()
+
+        # stored shapes move first, so anything spawned this frame doesn't move
+        # until next frame (same as with Group.update)
+        with self.profiler.phase("update"):
+            if self.entity_store is not None:
+                self.entity_store.update(self.dt)
+            self.updatable.update(self.dt)
         
         # Check collisions
+        with self.profiler.phase("collisions"):
+            self.check_collisions()
+
+        # Get rid of anything that has left the playfield or outlived its ttl
+        with self.profiler.phase("cull"):
+            self.cull_expired()
+
+        if self.particles is not None:
+            with self.profiler.phase("particles"):
+                self.particles.update(self.dt)
+
+        # killed slots and pooled shapes can be reused from next frame on
+        if self.entity_store is not None:
+            self.entity_store.recycle()
+        for pool in self.pools:
+            pool.recycle()
+
+        self.frame_allocations = CircleShape.allocations - allocations_before
+        self.frame_allocated_blocks = sys.getallocatedblocks() - blocks_before
+
+    def check_collisions(self):
+        if self.entity_store is not None:
+            self.check_collisions_entity_store()
+        elif self.use_swept_collisions:
+            self.check_collisions_swept()
+        elif self.use_spatial_hash:
+            self.check_collisions_spatial_hash()
+        else:
+            self.check_collisions_brute_force()
+
+    def check_collisions_entity_store(self):
+        # Same rules again, but all the distance tests run as array operations.
+        # Hits come back sorted by group order so they resolve like the loops above
+        store = self.entity_store
+        player = self.player
+        swept = self.use_swept_collisions
+        start = player.previous_position if swept else None
+        if store.any_overlap(player.position, player.radius, KIND_ASTEROID, start, self.store_owner):
+            self.game_state = "game_over"
+        self.resolve_stored_hits(*store.find_overlaps(KIND_ASTEROID, KIND_SHOT, swept=swept, owner=self.store_owner))
+
+    def resolve_stored_hits(self, asteroid_slots, shot_slots):
+        # shot/asteroid pairs from EntityStore.find_overlaps, in the order they happened
+        store = self.entity_store
+        swept = self.use_swept_collisions
+        for asteroid_slot, shot_slot in zip(asteroid_slots.tolist(), shot_slots.tolist()):
+            asteroid = store.views[asteroid_slot]
+            shot = store.views[shot_slot]
+            if not shot.alive() or (swept and not asteroid.alive()):
+                continue
+            self.score += self.calculate_asteroid_points(asteroid)
+            shot.kill()
+            asteroid.split()
+
+    def cull_expired(self):
+        if self.entity_store is not None:
+            expired = self.entity_store.expired_views(self.store_owner)
+        else:
+            expired = [shape for shape in self.asteroids if shape.is_expired()]
+            expired += [shape for shape in self.shots if shape.is_expired()]
+        return self.remove_expired(expired)
+
+    def remove_expired(self, expired):
+        # remove the whole batch from every group at once instead of kill() per sprite
+        if expired:
+            for group in (self.updatable, self.drawable, self.asteroids, self.shots):
+                group.remove(*expired)
+            for shape in expired:
+                shape.release()
+        self.culled_count += len(expired)
+        return len(expired)
+
+    def entity_counts(self):
+        """Live entity counts, useful to check long sessions stay flat"""
+        return {
+            "updatable": len(self.updatable),
+            "drawable": len(self.drawable),
+            "asteroids": len(self.asteroids),
+            "shots": len(self.shots),
+            "culled": self.culled_count,
+        }
+
+    def check_collisions_brute_force(self):
         for asteroid in self.asteroids:
             if asteroid.collide(self.player):
                 self.game_state = "game_over"
@@ -277,29 +594,257 @@ class Game:
                     self.score += self.calculate_asteroid_points(asteroid)                    
                     shot.kill()
                     asteroid.split()
+
+    def check_collisions_spatial_hash(self):
+        # Same rules as the brute force version, but each asteroid only looks at
+        # shots in its neighbouring cells. Candidates come back in shots-group
+        # order so hits (and the random splits they cause) happen in the same order
+        self.shot_grid.rebuild(self.shots)
+        for asteroid in self.asteroids:
+            if asteroid.collide(self.player):
+                self.game_state = "game_over"
+            for order, shot in self.shot_grid.query(asteroid.position):
+                # skip shots that already hit an earlier asteroid this frame
+                if not shot.alive():
+                    continue
+                if shot.collide(asteroid):
+                    self.score += self.calculate_asteroid_points(asteroid)
+                    shot.kill()
+                    asteroid.split()
     
-    def draw(self):
-        self.screen.fill("black")
-        
-        # Draw all game objects
-        for d in self.drawable:
-               d.draw(self.screen)
-               
-        # Draw score
-        self.draw_score()
+    def check_collisions_swept(self):
+        # Same rules as check_collisions_spatial_hash, but over the whole step:
+        # a shot moves PLAYER_SHOOT_SPEED * dt per step, which at low tick rates
+        # is more than a small asteroid is wide. Every pair gets a time of impact
+        # and the hits resolve in that order (ties in group order, like the others)
+        for asteroid in self.asteroids:
+            if asteroid.collide_swept(self.player):
+                self.game_state = "game_over"
+                break
+        for asteroid, shot in self.swept_hits():
+            # once hit, a shot or asteroid is gone for the rest of the step
+            if not shot.alive() or not asteroid.alive():
+                continue
+            self.score += self.calculate_asteroid_points(asteroid)
+            shot.kill()
+            asteroid.split()
+
+    def swept_hits(self):
+        """(asteroid, shot) pairs that touched during the last step, in the order they did"""
+        # shots go in every cell their own path covers, and each asteroid only
+        # looks at the cells its own path covers
+        shots = self.shots.sprites()
+        asteroids = self.asteroids.sprites()
+        if self.use_spatial_hash:
+            self.shot_grid.rebuild_swept(shots)
+        else:
+            # every pair, to cross-check the grid's padding against
+            all_shots = list(enumerate(shots))
+
+        hits = []
+        for asteroid_order, asteroid in enumerate(asteroids):
+            start = asteroid.previous_position
+            end = asteroid.position
+            if self.use_spatial_hash:
+                candidates = self.shot_grid.query_swept(start, end, asteroid.radius)
+            else:
+                candidates = all_shots
+            for shot_order, shot in candidates:
+                t = time_of_impact(start, end, shot.previous_position, shot.position, asteroid.radius + shot.radius)
+                if t is not None:
+                    hits.append((t, asteroid_order, shot_order))
+        hits.sort()
+        return [(asteroids[asteroid_order], shots[shot_order]) for t, asteroid_order, shot_order in hits]
+
+    def step(self, dt):
+        """Advance the simulation by exactly one tick of dt seconds"""
+        if self.interpolate or self.use_swept_collisions:
+            # interpolated drawing blends from here, swept collisions sweep from here
+            self.save_previous_state()
+        self.dt = dt
+        self.update()
+        self.frame += 1
+        if self.snapshots_enabled and self.frame % self.snapshot_interval == 0:
+            with self.profiler.phase("snapshot"):
+                self.rewind_buffer.push(save_state(self))
+        for listener in self.tick_listeners:
+            listener.on_tick(self)
+
+    def save_previous_state(self):
+        # remember where everything was so draw() can blend towards the new state
+        if self.entity_store is not None:
+            self.entity_store.save_previous_state()
+            self.player.save_previous_state()
+        else:
+            for shape in self.drawable:
+                shape.save_previous_state()
+
+    def advance(self, frame_time):
+        """Run as many fixed steps as frame_time allows, returns the interpolation alpha"""
+        step_time = 1 / self.simulation_rate
+        self.accumulator += frame_time
+        steps = 0
+        while self.accumulator >= step_time and self.game_state == "playing":
+            if steps == self.max_catchup_steps:
+                # too far behind, slow the game down rather than spiral
+                self.accumulator = 0.0
+                break
+            self.step(step_time)
+            self.accumulator -= step_time
+            steps += 1
+        if not self.interpolate:
+            return 1.0
+        return min(self.accumulator / step_time, 1.0)
+
+    def rewind(self):
+        """Go back one snapshot in the rewind buffer, returns the alpha to draw with"""
+        data = self.rewind_buffer.pop()
+        if data is not None:
+            restore_state(self, data)
+        return 1.0
+
+    def run_headless(self, max_frames, dt=1 / 60):
+        """Simulate with a fixed dt as fast as possible until game over or max_frames"""
+        pipelined = self.pipelined and self.render
+
+        def simulate():
+            self.step(dt)
+            return 1.0
+
+        while self.frame < max_frames and self.game_state == "playing":
+            if pipelined:
+                start = time.perf_counter()
+                self.draw_pipelined(simulate)
+                self.end_profiler_frame((time.perf_counter() - start) * 1000)
+                continue
+            self.step(dt)
+            if self.render:
+                self.draw()
+            self.end_profiler_frame()
+        return self.frame
+
+    def draw_pipelined(self, simulate):
+        """Run simulate() on the simulation thread while the last captured frame is drawn.
+
+        simulate returns the alpha to capture the new frame at. The game is only
+        touched by the simulation thread until this returns.
+        """
+        if self.pipeline is None:
+            self.pipeline = SimulationPipeline()
+        frame = self.pipeline.front
+        if frame is None or frame.tick != self.frame:
+            # nothing captured yet, or the game was reset or loaded since
+            frame = self.capture_frame()
+        self.pipeline.submit(lambda: self.capture_frame(simulate()))
+        self.draw(frame=frame)
+        self.pipeline.wait()
+
+    def capture_frame(self, alpha=1.0):
+        """What draw() needs from the game right now, as a RenderFrame"""
+        # always through the atlas: draw() on a shape reads its live state
+        atlas = self.sprite_atlas
+        particles = self.particles.capture() if self.particles is not None else None
+        return RenderFrame(self.frame, [d.blit_item(atlas, alpha) for d in self.drawable], particles, self.score)
+
+    def end_profiler_frame(self, frame_ms=None):
+        counts = self.entity_counts()
+        counts["splits"] = Asteroid.split_count - self.splits_before_frame
+        counts["allocations"] = self.frame_allocations
+        if self.particles is not None:
+            counts["live_particles"] = self.particles.count
+        if self.quality is not None:
+            counts["quality"] = self.quality.level
+        self.splits_before_frame = Asteroid.split_count
+        self.profiler.end_frame(counts, frame_ms)
+        if self.quality is not None and self.quality.record(self.profiler.samples["frame"][-1]):
+            self.apply_quality(self.quality.settings)
+
+    def state_hash(self):
+        """Hash of the whole simulation state, equal for runs that played out the same"""
+        digest = hashlib.sha256()
+        digest.update(struct.pack("<qq", self.frame, self.score))
+        digest.update(struct.pack(
+            "<6d",
+            self.player.position.x,
+            self.player.position.y,
+            self.player.rotation,
+            self.player.timer,
+            self.asteroid_field.spawn_timer,
+            self.asteroid_field.elapsed,
+        ))
+        for group in (self.asteroids, self.shots):
+            for shape in group:
+                position = shape.position
+                velocity = shape.velocity
+                digest.update(struct.pack(
+                    "<5d", position.x, position.y, velocity.x, velocity.y, shape.radius
+                ))
+        return digest.hexdigest()
+
+    def draw(self, alpha=1.0, frame=None):
+        # frame is a RenderFrame to draw instead of the live game (pipelined mode)
+        # the game screen paints over whatever menu was showing
+        self.static_screen_key = None
+        with self.profiler.phase("draw"):
+            self.draw_world(alpha, frame.blits if frame is not None else None)
+
+        # particles go under the HUD, timed on their own
+        if self.particles is not None:
+            with self.profiler.phase("particles"):
+                self.particles.draw(self.world_surface, self.draw_scale, frame.particles if frame is not None else None)
+
+        with self.profiler.phase("draw"):
+            self.present_world()
+            # Draw score, on top at the window's own resolution
+            self.draw_score(frame.score if frame is not None else self.score)
+            if self.profiler.overlay_visible:
+                self.profiler.draw_overlay(self.screen, self.text_cache)
         
         # Update display
-        pygame.display.flip()
+        with self.profiler.phase("flip"):
+            pygame.display.flip()
+
+    def draw_world(self, alpha=1.0, blits=None):
+        world = self.world_surface
+        if self.view is not self.screen:
+            self.screen.fill("black")  # letterbox bars, the HUD draws over them
+        world.fill("black")
+
+        # Draw all game objects
+        if blits is not None:
+            world.blits(blits, False)
+        elif self.use_sprite_atlas:
+            atlas = self.sprite_atlas
+            world.blits([d.blit_item(atlas, alpha) for d in self.drawable], False)
+        else:
+            for d in self.drawable:
+                d.draw(world, alpha)
 
-    def draw_score(self):
-        font = pygame.font.Font(None, 36)
-        score_text = font.render(f"Score: {self.score}", True, (255, 255, 255))
+    def present_world(self):
+        # scale the world into the window in one step
+        world = self.world_surface
+        if world is self.view:
+            return
+        if world.get_width() > self.view.get_width():
+            # drawn above the window's resolution, average it down
+            pygame.transform.smoothscale(world, self.view.get_size(), self.view)
+        else:
+            pygame.transform.scale(world, self.view.get_size(), self.view)
+
+    def draw_score(self, score):
+        if self.hud_score is None or self.frames_drawn % self.quality_settings.hud_interval == 0:
+            self.hud_score = score
+        self.frames_drawn += 1
+        score_text = self.text_cache.render(f"Score: {self.hud_score}", 36, (255, 255, 255))
         self.screen.blit(score_text, (10, 10))
 
     def run(self):
         while True:
+            frame_start = time.perf_counter()
             # Handle events
-            if not self.handle_events():
+            with self.profiler.phase("events"):
+                running = self.handle_events()
+            if not running:
                 return
             
             if self.game_state == "title_screen":
@@ -315,10 +860,29 @@ class Game:
                 self.draw_high_scores()
 
             else: #game_state == "playing"
-                # Update game state
-                self.update()
-                # Draw everything
-                self.draw()
+                # Update game state in fixed steps, or run it backwards while R is held
+                if self.snapshots_enabled and self.rewind_buffer and pygame.key.get_pressed()[pygame.K_r]:
+                    simulate = self.rewind
+                else:
+                    frame_time = self.dt
+                    simulate = lambda: self.advance(frame_time)
+                if self.pipelined:
+                    # steps run on the worker while the last frame is drawn, so
+                    # the frame takes as long as the slower of the two
+                    self.draw_pipelined(simulate)
+                    self.end_profiler_frame((time.perf_counter() - frame_start) * 1000)
+                else:
+                    # Draw everything, blended between the last two steps
+                    self.draw(simulate())
+                    self.end_profiler_frame()
+
+            if self.game_state != "playing":
+                # menu frames would only muddy the numbers
+                self.profiler.discard_frame()
             
-            # Manage frame rate
-            self.dt = self.game_clock.tick(60) / 1000
\ No newline at end of file
+            # Manage frame rate. Menus only need to notice key presses, so they
+            # tick slowly instead of spinning at full speed
+            if self.game_state == "playing":
+                self.dt = self.game_clock.tick(self.render_fps) / 1000
+            else:
+                self.dt = self.game_clock.tick(MENU_FPS) / 1000
\ No newline at end of file
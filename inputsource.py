@@ -0,0 +1,74 @@
+import pygame
+from typing import NamedTuple
+
+
+# The buttons Player.update cares about, as plain booleans
+class Controls(NamedTuple):
+    left: bool = False  # A
+    right: bool = False  # D
+    forward: bool = False  # W
+    backward: bool = False  # S
+    shoot: bool = False  # SPACE
+
+    def to_bits(self):
+        # one bit per button, in field order (A=1, D=2, W=4, S=8, SPACE=16)
+        bits = 0
+        for i, pressed in enumerate(self):
+            if pressed:
+                bits |= 1 << i
+        return bits
+
+    @classmethod
+    def from_bits(cls, bits):
+        return cls(*(bool(bits & (1 << i)) for i in range(len(cls._fields))))
+
+
+NO_CONTROLS = Controls()
+
+
+# Input sources hand the player one Controls per simulation tick via read()
+class KeyboardInput:
+    def read(self):
+        keys = pygame.key.get_pressed()
+        return Controls(
+            left=keys[pygame.K_a],
+            right=keys[pygame.K_d],
+            forward=keys[pygame.K_w],
+            backward=keys[pygame.K_s],
+            shoot=keys[pygame.K_SPACE],
+        )
+
+
+class HeldInput:
+    # hands back whatever controls were set last, for when something outside the
+    # game decides each tick's input (VecEnv actions, network packets)
+    def __init__(self):
+        self.controls = NO_CONTROLS
+
+    def read(self):
+        return self.controls
+
+
+class ScriptedInput:
+    """Plays back a list of (ticks, Controls) steps, looping when it runs out"""
+
+    def __init__(self, script):
+        self.script = script
+        self.step = 0
+        self.ticks_left = script[0][0]
+
+    def read(self):
+        while self.ticks_left <= 0:
+            self.step = (self.step + 1) % len(self.script)
+            self.ticks_left = self.script[self.step][0]
+        self.ticks_left -= 1
+        return self.script[self.step][1]
+
+
+# A simple deterministic pattern for headless runs: turn, fly, and keep shooting
+DEMO_SCRIPT = [
+    (45, Controls(right=True, shoot=True)),
+    (30, Controls(forward=True, shoot=True)),
+    (60, Controls(left=True, shoot=True)),
+    (30, Controls(backward=True, shoot=True)),
+]
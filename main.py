@@ -1,8 +1,16 @@
 # this allows us to use code from
 # the open-source pygame library
 # throughout this file
+import argparse
+import os
+import random
+import time
 import pygame
+from constants import SIMULATION_RATE, RENDER_FPS, WINDOW_WIDTH, WINDOW_HEIGHT, RENDER_SCALE
 from game import Game
+from inputsource import KeyboardInput, ScriptedInput, DEMO_SCRIPT
+from replay import Replay, ReplayInput, ReplayRecorder
+from waves import WaveSchedule
 
 def main():
      pass
@@ -55,9 +63,136 @@ def main():
           dt = game_clock.tick(60) / 1000
      """      
 
+def parse_args():
+    parser = argparse.ArgumentParser(description="Asteroids")
+    parser.add_argument("--headless", action="store_true",
+                        help="run without a window, with a scripted player and a fixed dt")
+    parser.add_argument("--no-render", action="store_true",
+                        help="headless only: skip drawing completely")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the game's RNG")
+    parser.add_argument("--frames", type=int, default=3600,
+                        help="headless only: max ticks to simulate")
+    parser.add_argument("--dt", type=float, default=None,
+                        help="headless only: fixed tick length (default 1 / --sim-rate)")
+    parser.add_argument("--profile", action="store_true", help="show the frame profiler overlay")
+    parser.add_argument("--profile-out", default=None,
+                        help="write per-frame timings to this .jsonl or .csv file")
+    parser.add_argument("--sim-rate", type=int, default=SIMULATION_RATE,
+                        help="simulation steps per second")
+    parser.add_argument("--render-fps", type=int, default=RENDER_FPS,
+                        help="frame rate cap for drawing, 0 = uncapped")
+    parser.add_argument("--window-size", type=int, nargs=2, default=[WINDOW_WIDTH, WINDOW_HEIGHT],
+                        metavar=("WIDTH", "HEIGHT"), help="window size in pixels, the playfield is fitted into it")
+    parser.add_argument("--render-scale", type=float, default=RENDER_SCALE,
+                        help="draw the world at this fraction (or multiple) of the window's resolution")
+    parser.add_argument("--discrete-collisions", action="store_true",
+                        help="only check overlaps at the end of each step instead of sweeping over it")
+    parser.add_argument("--fixed-quality", action="store_true",
+                        help="always draw at full quality, even when frames run over budget")
+    parser.add_argument("--pipelined", action="store_true",
+                        help="simulate on a worker thread while the main thread draws the previous frame")
+    parser.add_argument("--waves", default=None,
+                        help="spawn asteroids from this JSON wave script (see waves.py)")
+    parser.add_argument("--record", default=None, help="record this game's inputs to a replay file")
+    parser.add_argument("--replay", default=None,
+                        help="play back a replay file (as fast as possible with --headless)")
+    return parser.parse_args()
+
 if __name__ == "__main__":
     #main() <-- BEFORE REFACTORING
+    args = parse_args()
+    if args.headless:
+        # has to be set before pygame.init() touches the display
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
     pygame.init()
-    game = Game()
-    game.run()
+
+    # Work out where input comes from: a replay, the keyboard, or the demo script
+    seed = args.seed
+    sim_rate = args.sim_rate
+    replay_input = None
+    recorder = None
+    waves = WaveSchedule.load(args.waves) if args.waves else None
+    if args.replay:
+        replay = Replay.load(args.replay)
+        seed = replay.seed
+        sim_rate = replay.simulation_rate
+        waves = replay.waves
+        replay_input = ReplayInput(replay)
+        input_source = replay_input
+    else:
+        input_source = ScriptedInput(DEMO_SCRIPT) if args.headless else KeyboardInput()
+    # --dt is the headless tick length as given. A replay only stores whole
+    # steps per second though, so a recording needs a dt of 1/integer
+    dt = args.dt if args.dt is not None and not args.replay else 1 / sim_rate
+    if args.record and args.dt is not None and not args.replay:
+        sim_rate = round(1 / args.dt) if args.dt > 0 else 0
+        if sim_rate < 1 or abs(1 / sim_rate - args.dt) > 1e-9:
+            raise SystemExit(f"--record needs a --dt of 1/N for a whole number N, not {args.dt}")
+        dt = 1 / sim_rate
+    if args.record:
+        # a replay is only reproducible from a known seed
+        if seed is None:
+            seed = random.randrange(2**62)
+        recorder = ReplayRecorder(input_source, seed, sim_rate)
+        recorder.replay.waves = waves
+        input_source = recorder
+
+    game = Game(seed=seed, input_source=input_source, headless=args.headless, render=not args.no_render,
+                profile_path=args.profile_out, window_size=tuple(args.window_size), waves=waves)
+    game.simulation_rate = sim_rate
+    game.render_fps = args.render_fps
+    # replays have to collide the way they were recorded
+    game.use_swept_collisions = replay.swept_collisions if args.replay else not args.discrete_collisions
+    if recorder is not None:
+        recorder.replay.swept_collisions = game.use_swept_collisions
+    if args.render_scale != game.render_scale:
+        game.set_render_scale(args.render_scale)
+    if args.fixed_quality:
+        game.quality = None
+    if args.pipelined:
+        game.pipelined = True
+    if args.record or args.replay:
+        # rewinding or loading a quick save would make the input log meaningless
+        game.snapshots_enabled = False
+    for listener in (replay_input, recorder):
+        if listener is not None:
+            game.tick_listeners.append(listener)
+
+    if args.headless:
+        max_frames = replay.ticks if args.replay else args.frames
+        start = time.perf_counter()
+        frames = game.run_headless(max_frames, dt)
+        elapsed = time.perf_counter() - start
+        print(f"Simulated {frames} frames in {elapsed:.3f}s ({frames / elapsed:.0f} fps)")
+        print(f"Score: {game.score}")
+        print(f"State hash: {game.state_hash()}")
+        if args.profile:
+            for phase, values in game.profiler.stats().items():
+                print(f"{phase:<10} p50 {values['p50']:.3f}ms  p95 {values['p95']:.3f}ms  p99 {values['p99']:.3f}ms")
+    else:
+        if args.replay:
+            game.game_state = "playing"  # skip the title screen, the replay starts right away
+        game.profiler.overlay_visible = args.profile
+        game.run()
+        if game.quality is not None and game.quality.decisions:
+            summary = game.quality.summary()
+            shares = ", ".join(f"level {level}: {share:.0%}" for level, share in enumerate(summary["time_at_level"]))
+            print(f"Quality dropped {summary['degrades']} times ({summary['changes']} changes), frames at {shares}")
+
+    if recorder is not None:
+        recorder.save(args.record)
+        print(f"Recorded {recorder.replay.ticks} ticks to {args.record} ({os.path.getsize(args.record)} bytes)")
+    if replay_input is not None:
+        if replay_input.diverged_at is None:
+            print(f"Replay matched all {replay_input.checked} checksums")
+        else:
+            print(f"Replay DIVERGED at tick {replay_input.diverged_at}")
+    if game.pipeline is not None:
+        game.pipeline.close()
+        stats = game.pipeline.stats()
+        print(f"Pipeline: main thread busy {stats['main_busy']:.0%} (cpu {stats['main_cpu']:.0%}), "
+              f"simulation thread busy {stats['worker_busy']:.0%} (cpu {stats['worker_cpu']:.0%}), "
+              f"waited {stats['wait_ms_per_frame']:.2f}ms per frame for the simulation")
+    game.profiler.close()
+    game.score_store.close()
     pygame.quit()
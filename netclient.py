@@ -0,0 +1,209 @@
+# Multiplayer client: predicts its own ship locally, draws everything else a
+# little in the past, interpolated between server snapshots.
+#
+# Usage:
+#   python netclient.py --host 127.0.0.1 --port 47800
+import argparse
+import socket
+from collections import deque
+import pygame
+from constants import *
+from player import Player
+from inputsource import Controls, HeldInput, KeyboardInput
+from spriteatlas import SpriteAtlas
+from textcache import TextCache
+from netcode import *
+
+
+class PredictedShip(Player):
+    # our own ship, simulated ahead of the server from our own inputs. Shots
+    # only exist on the server, so shooting here just restarts the cooldown
+    containers = ()
+
+    __slots__ = ("input_source",)
+
+    def __init__(self):
+        super().__init__(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+        self.input_source = HeldInput()
+
+    def shoot(self):
+        self.shots_fired += 1
+
+
+class NetClient:
+    def __init__(self, channel, server_address, input_source):
+        self.channel = channel
+        self.server_address = server_address
+        self.input_source = input_source
+        self.dt = 1 / SIMULATION_RATE
+        self.ship = PredictedShip()
+        self.ship_id = None
+        self.sequence = 0
+        self.pending = deque()  # (sequence, bits) the server hasn't applied yet
+        self.recent_bits = deque(maxlen=NET_INPUT_REDUNDANCY)
+        self.snapshots = {}  # tick -> snapshot, for delta baselines and interpolation
+        self.latest_tick = 0
+        # server tick we're drawing, NET_INTERPOLATION_DELAY behind the newest snapshot
+        self.render_tick = None
+        self.snapshots_received = 0
+        self.decode_failures = 0
+        self.corrections = deque(maxlen=PROFILER_WINDOW)  # px each server update moved our ship
+
+    def tick(self):
+        self.receive()
+        controls = self.input_source.read()
+        bits = controls.to_bits()
+        self.sequence += 1
+        self.pending.append((self.sequence, bits))
+        self.recent_bits.appendleft(bits)
+        self.ship.input_source.controls = controls
+        self.ship.update(self.dt)
+        self.channel.send(encode_input(self.latest_tick, self.sequence, self.recent_bits), self.server_address)
+        if self.render_tick is not None:
+            self.render_tick += 1
+
+    def receive(self):
+        for data, address in self.channel.receive():
+            if not data or data[0] != PACKET_SNAPSHOT:
+                continue
+            ship_id, input_sequence, timer, offset = decode_snapshot_header(data)
+            try:
+                tick, snapshot = decode_body(data, offset, self.snapshots)
+            except KeyError:
+                # its baseline is too old, the next one will be a full snapshot
+                self.decode_failures += 1
+                continue
+            self.snapshots[tick] = snapshot
+            self.snapshots_received += 1
+            if tick <= self.latest_tick:
+                continue  # arrived out of order, only good for interpolation
+            self.latest_tick = tick
+            self.ship_id = ship_id
+            self.reconcile(snapshot, input_sequence, timer)
+            for old_tick in [t for t in self.snapshots if t < tick - NET_BASELINE_WINDOW * 2]:
+                del self.snapshots[old_tick]
+
+            target = tick - NET_INTERPOLATION_DELAY
+            if self.render_tick is None or abs(self.render_tick - target) > NET_SNAPSHOT_INTERVAL * 4:
+                self.render_tick = target
+            else:
+                # drift towards the target instead of jumping, so motion stays smooth
+                self.render_tick += (target - self.render_tick) * 0.1
+
+    def reconcile(self, snapshot, input_sequence, timer):
+        # take the server's word for where our ship was after input_sequence,
+        # then replay the inputs it hasn't seen yet on top
+        state = snapshot["ships"].get(self.ship_id)
+        if state is None:
+            return
+        predicted = pygame.Vector2(self.ship.position)
+        self.ship.position.update(state[0] / NET_POSITION_SCALE, state[1] / NET_POSITION_SCALE)
+        self.ship.rotation = dequantize_rotation(state[2])
+        self.ship.timer = timer
+        while self.pending and self.pending[0][0] <= input_sequence:
+            self.pending.popleft()
+        for sequence, bits in self.pending:
+            self.ship.input_source.controls = Controls.from_bits(bits)
+            self.ship.update(self.dt)
+        self.corrections.append(predicted.distance_to(self.ship.position))
+
+    @property
+    def score(self):
+        state = self.snapshots.get(self.latest_tick, {}).get("ships", {}).get(self.ship_id)
+        return state[3] if state else 0
+
+    def bracket(self, tick):
+        older = newer = None
+        for snapshot_tick in sorted(self.snapshots):
+            if snapshot_tick <= tick:
+                older = snapshot_tick
+            else:
+                newer = snapshot_tick
+                break
+        if older is None:
+            return newer, None
+        return older, newer
+
+    def blit_items(self, atlas):
+        """(surface, position) pairs for everything, ready for Surface.blits"""
+        if self.render_tick is None:
+            return [self.ship.blit_item(atlas)]
+        older, newer = self.bracket(self.render_tick)
+        snapshot = self.snapshots[older]
+        items = []
+        for record in snapshot["asteroids"].values():
+            x, y = extrapolate(record, self.render_tick)
+            surface, half = atlas.circle(record[5])
+            items.append((surface, (x - half, y - half)))
+        surface, half = atlas.circle(SHOT_RADIUS)
+        for record in snapshot["shots"].values():
+            x, y = extrapolate(record, self.render_tick)
+            items.append((surface, (x - half, y - half)))
+
+        # other ships move however their players like, so blend between snapshots
+        later = self.snapshots[newer]["ships"] if newer is not None else {}
+        alpha = (self.render_tick - older) / (newer - older) if newer is not None else 0.0
+        for ship_id, (x, y, rotation, score) in snapshot["ships"].items():
+            if ship_id == self.ship_id:
+                continue
+            x /= NET_POSITION_SCALE
+            y /= NET_POSITION_SCALE
+            rotation = dequantize_rotation(rotation)
+            if ship_id in later:
+                next_x, next_y, next_rotation, _ = later[ship_id]
+                x += (next_x / NET_POSITION_SCALE - x) * alpha
+                y += (next_y / NET_POSITION_SCALE - y) * alpha
+                turn = (dequantize_rotation(next_rotation) - rotation + 180) % 360 - 180
+                rotation += turn * alpha
+            surface, half = atlas.ship(rotation)
+            items.append((surface, (x - half, y - half)))
+        items.append(self.ship.blit_item(atlas))
+        return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Join an Asteroids multiplayer server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=NET_PORT)
+    parser.add_argument("--latency", type=float, default=0.0, help="fake one-way latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this much")
+    parser.add_argument("--loss", type=float, default=0.0, help="fraction of packets to drop")
+    args = parser.parse_args()
+
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    atlas = SpriteAtlas()
+    text_cache = TextCache()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    channel = LossyChannel(sock, args.latency, args.jitter, args.loss)
+    client = NetClient(channel, (args.host, args.port), KeyboardInput())
+
+    clock = pygame.time.Clock()
+    accumulator = 0.0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+        # same fixed-step idea as Game.advance: ticks stay 1/SIMULATION_RATE
+        # long whatever the frame rate, because the server counts them
+        accumulator += clock.tick(RENDER_FPS) / 1000
+        steps = 0
+        while accumulator >= client.dt and steps < MAX_CATCHUP_STEPS:
+            client.tick()
+            accumulator -= client.dt
+            steps += 1
+        accumulator = min(accumulator, client.dt)
+
+        screen.fill("black")
+        screen.blits(client.blit_items(atlas), False)
+        score_text = text_cache.render(f"Score: {client.score}", 36, (255, 255, 255))
+        screen.blit(score_text, (10, 10))
+        pygame.display.flip()
+
+    channel.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
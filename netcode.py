@@ -0,0 +1,255 @@
+import heapq
+import random
+import time
+from constants import *
+from replay import write_varint, read_varint
+
+# Wire format shared by netserver.py and netclient.py. Everything is varints
+# (see replay.py), signed values are zigzag encoded.
+#
+# input packet (client -> server), sent every client tick:
+#   type, latest snapshot tick decoded (0 = none), newest input sequence number,
+#   count, then that many Controls bit masks, newest first. Each packet repeats
+#   the last NET_INPUT_REDUNDANCY inputs so a lost packet costs nothing
+#
+# snapshot packet (server -> client), every NET_SNAPSHOT_INTERVAL ticks:
+#   type, your ship id, last input sequence applied, your gun cooldown in ms,
+#   then the body: tick, tick - baseline tick (0 = full snapshot), and for each
+#   kind: removed ids, then changed or new objects as (id delta, flags, fields).
+#   Only fields that differ from the baseline are sent
+PACKET_INPUT = 1
+PACKET_SNAPSHOT = 2
+
+# A snapshot is {kind: {net id: tuple of ints}}. Ships send where they are:
+#   (x, y, rotation, score)
+# Asteroids and shots fly in straight lines, so they send where they were at
+# some tick and how fast they go, and clients work out the rest (dead reckoning):
+#   asteroids: (x, y, vx, vy, tick, radius)    shots: (x, y, vx, vy, tick)
+# A rock that isn't hit costs nothing after the snapshot it appeared in
+KINDS = ("ships", "asteroids", "shots")
+FIELD_COUNTS = {"ships": 4, "asteroids": 6, "shots": 5}
+FLAG_NEW = 0x80
+
+
+def zigzag(value):
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value):
+    return value >> 1 if not value & 1 else -(value >> 1) - 1
+
+
+def quantize_rotation(degrees):
+    return round(degrees % 360 * 65536 / 360) % 65536
+
+
+def dequantize_rotation(value):
+    return value * 360 / 65536
+
+
+def moving_record(shape, tick):
+    position = shape.position
+    velocity = shape.velocity
+    return (
+        round(position.x * NET_POSITION_SCALE),
+        round(position.y * NET_POSITION_SCALE),
+        round(velocity.x * NET_VELOCITY_SCALE),
+        round(velocity.y * NET_VELOCITY_SCALE),
+        tick,
+    )
+
+
+def extrapolate(record, tick):
+    """Where a dead-reckoned asteroid or shot is at tick (can be fractional)"""
+    seconds = (tick - record[4]) / SIMULATION_RATE
+    return (
+        record[0] / NET_POSITION_SCALE + record[2] / NET_VELOCITY_SCALE * seconds,
+        record[1] / NET_POSITION_SCALE + record[3] / NET_VELOCITY_SCALE * seconds,
+    )
+
+
+def empty_snapshot():
+    return {kind: {} for kind in KINDS}
+
+
+def encode_body(tick, snapshot, baseline_tick=0, baseline=None):
+    out = bytearray()
+    write_varint(out, tick)
+    if baseline is None:
+        baseline = empty_snapshot()
+        baseline_tick = tick
+    write_varint(out, tick - baseline_tick)
+    for kind in KINDS:
+        current = snapshot[kind]
+        previous = baseline[kind]
+
+        removed = sorted(previous.keys() - current.keys())
+        write_varint(out, len(removed))
+        last_id = 0
+        for net_id in removed:
+            write_varint(out, net_id - last_id)
+            last_id = net_id
+
+        changed = bytearray()
+        count = 0
+        last_id = 0
+        for net_id in sorted(current):
+            fields = current[net_id]
+            old = previous.get(net_id)
+            if old is None:
+                flags = FLAG_NEW
+                values = fields
+            else:
+                flags = 0
+                values = []
+                for i, (value, old_value) in enumerate(zip(fields, old)):
+                    if value != old_value:
+                        flags |= 1 << i
+                        values.append(value - old_value)
+                if not flags:
+                    continue
+            write_varint(changed, net_id - last_id)
+            changed.append(flags)
+            for value in values:
+                write_varint(changed, zigzag(value))
+            last_id = net_id
+            count += 1
+        write_varint(out, count)
+        out += changed
+    return bytes(out)
+
+
+def decode_body(data, offset, baselines):
+    """Returns (tick, snapshot). baselines maps tick -> snapshot already decoded"""
+    tick, offset = read_varint(data, offset)
+    back, offset = read_varint(data, offset)
+    if back == 0:
+        baseline = empty_snapshot()
+    else:
+        baseline = baselines.get(tick - back)
+        if baseline is None:
+            raise KeyError(f"snapshot {tick} needs baseline {tick - back}, which is gone")
+
+    snapshot = {}
+    for kind in KINDS:
+        objects = dict(baseline[kind])
+        count, offset = read_varint(data, offset)
+        net_id = 0
+        for _ in range(count):
+            delta, offset = read_varint(data, offset)
+            net_id += delta
+            del objects[net_id]
+
+        count, offset = read_varint(data, offset)
+        net_id = 0
+        for _ in range(count):
+            delta, offset = read_varint(data, offset)
+            net_id += delta
+            flags = data[offset]
+            offset += 1
+            if flags & FLAG_NEW:
+                fields = []
+                for _ in range(FIELD_COUNTS[kind]):
+                    value, offset = read_varint(data, offset)
+                    fields.append(unzigzag(value))
+            else:
+                fields = list(objects[net_id])
+                for i in range(len(fields)):
+                    if flags & (1 << i):
+                        value, offset = read_varint(data, offset)
+                        fields[i] += unzigzag(value)
+            objects[net_id] = tuple(fields)
+        snapshot[kind] = objects
+    return tick, snapshot
+
+
+def encode_input(ack_tick, sequence, history):
+    """history is the newest-first list of recent Controls bit masks"""
+    out = bytearray((PACKET_INPUT,))
+    write_varint(out, ack_tick)
+    write_varint(out, sequence)
+    out.append(len(history))
+    out += bytes(history)
+    return bytes(out)
+
+
+def decode_input(data):
+    """Returns (ack tick, [(sequence, bits), ...] newest first)"""
+    ack_tick, offset = read_varint(data, 1)
+    sequence, offset = read_varint(data, offset)
+    count = data[offset]
+    bits = data[offset + 1:offset + 1 + count]
+    if len(bits) != count:
+        raise ValueError("truncated input packet")
+    return ack_tick, [(sequence - i, bits[i]) for i in range(len(bits)) if sequence - i > 0]
+
+
+def encode_snapshot_header(ship_id, input_sequence, timer):
+    out = bytearray((PACKET_SNAPSHOT,))
+    write_varint(out, ship_id)
+    write_varint(out, input_sequence)
+    write_varint(out, max(0, round(timer * 1000)))
+    return bytes(out)
+
+
+def decode_snapshot_header(data):
+    """Returns (ship id, last input sequence, gun cooldown in seconds, body offset)"""
+    ship_id, offset = read_varint(data, 1)
+    input_sequence, offset = read_varint(data, offset)
+    timer_ms, offset = read_varint(data, offset)
+    return ship_id, input_sequence, timer_ms / 1000, offset
+
+
+# Non-blocking UDP socket wrapper that can fake a bad link on localhost:
+# every outgoing packet is dropped with probability `loss`, otherwise held back
+# for `latency` seconds plus up to `jitter` more (so packets can also arrive
+# out of order). Also counts what went through it
+class LossyChannel:
+    def __init__(self, sock, latency=0.0, jitter=0.0, loss=0.0, seed=None):
+        self.sock = sock
+        self.sock.setblocking(False)
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = random.Random(seed)
+        self.queue = []  # heap of (send time, order, data, address)
+        self.order = 0
+        self.packets_sent = 0
+        self.packets_dropped = 0
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def send(self, data, address):
+        self.packets_sent += 1
+        self.bytes_sent += len(data)
+        if self.loss and self.rng.random() < self.loss:
+            self.packets_dropped += 1
+            return
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay <= 0:
+            self.sock.sendto(data, address)
+            return
+        heapq.heappush(self.queue, (time.perf_counter() + delay, self.order, data, address))
+        self.order += 1
+
+    def flush(self):
+        # sends whatever delayed packets are due
+        now = time.perf_counter()
+        while self.queue and self.queue[0][0] <= now:
+            _, _, data, address = heapq.heappop(self.queue)
+            self.sock.sendto(data, address)
+
+    def receive(self):
+        self.flush()
+        packets = []
+        while True:
+            try:
+                data, address = self.sock.recvfrom(65535)
+            except (BlockingIOError, ConnectionResetError):
+                break
+            self.bytes_received += len(data)
+            packets.append((data, address))
+        return packets
+
+    def close(self):
+        self.sock.close()
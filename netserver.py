@@ -0,0 +1,332 @@
+# Authoritative multiplayer server. One Game simulates the asteroid field and
+# every connected ship; clients send their controls and get delta-compressed
+# snapshots back over UDP (see netcode.py for the wire format).
+#
+# Usage:
+#   python netserver.py --port 47800
+#   python netserver.py --latency 0.05 --jitter 0.02 --loss 0.05   # fake a bad link
+import argparse
+import os
+import socket
+import time
+from collections import deque
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from constants import *
+from game import Game
+from player import Player
+from asteroidfield import AsteroidField
+from inputsource import Controls, HeldInput, NO_CONTROLS
+from profiler import percentile
+from scorestore import MemoryScoreStore
+from netcode import *
+
+
+class ServerShip(Player):
+    # one per client. Scores are per ship, so shots remember who fired them
+    __slots__ = ("input_source", "score", "deaths")
+
+    def __init__(self, x, y):
+        super().__init__(x, y)
+        self.input_source = HeldInput()
+        self.score = 0
+        self.deaths = 0
+
+    def shoot(self):
+        shot = super().shoot()
+        shot.owner = self
+        return shot
+
+    def respawn(self):
+        self.position.update(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+        self.previous_position.update(self.position)  # a jump, not a sweep across the screen
+        self.rotation = 0
+        self.deaths += 1
+
+
+class ServerGame(Game):
+    """A headless Game with any number of ships and no game over"""
+
+    def __init__(self, seed=None):
+        super().__init__(seed=seed, headless=True, render=False, score_store=MemoryScoreStore())
+        # net ids are handed out per object, so pooled objects coming back as a
+        # new asteroid would keep the id (and velocity) of the old one
+        self.use_pooling = False
+        self.pools = []
+        self.activate()
+
+    def create_game_objects(self):
+        self.player = None
+        self.ships = {}
+        self.asteroid_field = AsteroidField(self.waves)
+
+    def add_ship(self, ship_id):
+        self.ships[ship_id] = ServerShip(SCREEN_WIDTH / 2, SCREEN_HEIGHT / 2)
+        return self.ships[ship_id]
+
+    def remove_ship(self, ship_id):
+        self.ships.pop(ship_id).kill()
+
+    def check_collisions(self):
+        # same rules as check_collisions_spatial_hash, except that a ship that
+        # gets hit respawns and points go to whoever fired the shot
+        ships = list(self.ships.values())
+        if self.use_swept_collisions:
+            self.check_collisions_swept_ships(ships)
+            return
+        self.shot_grid.rebuild(self.shots)
+        for asteroid in self.asteroids:
+            for ship in ships:
+                if asteroid.collide(ship):
+                    ship.respawn()
+            for order, shot in self.shot_grid.query(asteroid.position):
+                if not shot.alive():
+                    continue
+                if shot.collide(asteroid):
+                    shot.owner.score += self.calculate_asteroid_points(asteroid)
+                    shot.kill()
+                    asteroid.split()
+
+    def check_collisions_swept_ships(self, ships):
+        # and the same again over the whole step, like Game.check_collisions_swept
+        for asteroid in self.asteroids:
+            for ship in ships:
+                if asteroid.collide_swept(ship):
+                    ship.respawn()
+        for asteroid, shot in self.swept_hits():
+            if not shot.alive() or not asteroid.alive():
+                continue
+            shot.owner.score += self.calculate_asteroid_points(asteroid)
+            shot.kill()
+            asteroid.split()
+
+
+class ClientConnection:
+    def __init__(self, address, ship_id, ship, first_sequence):
+        self.address = address
+        self.ship_id = ship_id
+        self.ship = ship
+        self.acked_tick = 0
+        self.inputs = {}  # sequence -> Controls bits, waiting to be applied
+        self.next_sequence = first_sequence
+        self.last_applied = first_sequence - 1
+        self.last_heard = time.perf_counter()
+        self.bytes_sent = 0
+
+
+class NetServer:
+    def __init__(self, channel, seed=None, snapshot_interval=NET_SNAPSHOT_INTERVAL):
+        self.channel = channel
+        self.game = ServerGame(seed)
+        self.snapshot_interval = snapshot_interval
+        self.dt = 1 / SIMULATION_RATE
+        self.clients = {}  # address -> ClientConnection
+        self.next_ship_id = 1
+        self.bad_packets = 0  # malformed or useless packets dropped
+        # net ids for asteroids and shots: shape -> (net id, record)
+        self.net_ids = {}
+        self.next_net_id = 1
+        self.history = {}  # tick -> snapshot, kept for NET_BASELINE_WINDOW ticks
+        # per tick stats, for bytes per tick and server tick time
+        self.tick_times = deque(maxlen=PROFILER_WINDOW)
+        self.snapshot_times = deque(maxlen=PROFILER_WINDOW)
+        self.snapshot_bytes = deque(maxlen=PROFILER_WINDOW)
+        self.last_snapshot = None
+
+    def receive(self):
+        for data, address in self.channel.receive():
+            if not data or data[0] != PACKET_INPUT:
+                continue
+            # anyone can send us anything, a bad packet mustn't take the server down
+            try:
+                ack_tick, inputs = decode_input(data)
+            except (IndexError, ValueError):
+                self.bad_packets += 1
+                continue
+            client = self.clients.get(address)
+            if client is None:
+                if not inputs:
+                    # a join needs an input to start the ship's sequence from
+                    self.bad_packets += 1
+                    continue
+                # the first input from a new address is the join
+                ship_id = self.next_ship_id
+                self.next_ship_id += 1
+                client = ClientConnection(address, ship_id, self.game.add_ship(ship_id), inputs[-1][0])
+                self.clients[address] = client
+            client.last_heard = time.perf_counter()
+            client.acked_tick = max(client.acked_tick, ack_tick)
+            for sequence, bits in inputs:
+                if sequence >= client.next_sequence:
+                    client.inputs[sequence] = bits
+
+    def apply_inputs(self):
+        now = time.perf_counter()
+        for address, client in list(self.clients.items()):
+            if now - client.last_heard > NET_TIMEOUT:
+                self.game.remove_ship(client.ship_id)
+                del self.clients[address]
+                continue
+            bits = client.inputs.pop(client.next_sequence, None)
+            if bits is None and client.inputs and max(client.inputs) - client.next_sequence >= NET_INPUT_REDUNDANCY:
+                # inputs lost beyond what the redundancy covers, skip the gap
+                client.next_sequence = min(client.inputs)
+                bits = client.inputs.pop(client.next_sequence)
+            if bits is None:
+                # nothing arrived in time. Every input gets applied exactly once,
+                # so the client's prediction still adds up once it does arrive
+                client.ship.input_source.controls = NO_CONTROLS
+                continue
+            client.ship.input_source.controls = Controls.from_bits(bits)
+            client.last_applied = client.next_sequence
+            client.next_sequence += 1
+
+    def take_snapshot(self, tick):
+        game = self.game
+        ships = {
+            ship_id: (
+                round(ship.position.x * NET_POSITION_SCALE),
+                round(ship.position.y * NET_POSITION_SCALE),
+                quantize_rotation(ship.rotation),
+                ship.score,
+            )
+            for ship_id, ship in game.ships.items()
+        }
+        net_ids = {}
+        snapshot = {"ships": ships, "asteroids": {}, "shots": {}}
+        for kind, group in (("asteroids", game.asteroids), ("shots", game.shots)):
+            objects = snapshot[kind]
+            for shape in group:
+                entry = self.net_ids.get(shape)
+                if entry is None:
+                    net_id = self.next_net_id
+                    self.next_net_id += 1
+                    record = None
+                else:
+                    net_id, record = entry
+                    # only re-send when the client's extrapolation would be off
+                    x, y = extrapolate(record, tick)
+                    if (abs(x - shape.position.x) > NET_CORRECTION_THRESHOLD
+                            or abs(y - shape.position.y) > NET_CORRECTION_THRESHOLD):
+                        record = None
+                if record is None:
+                    record = moving_record(shape, tick)
+                    if kind == "asteroids":
+                        record += (round(shape.radius),)
+                net_ids[shape] = (net_id, record)
+                objects[net_id] = record
+        self.net_ids = net_ids
+        return snapshot
+
+    def send_snapshots(self, tick):
+        snapshot = self.take_snapshot(tick)
+        self.history[tick] = snapshot
+        self.last_snapshot = (tick, snapshot)
+        for old_tick in [t for t in self.history if t <= tick - NET_BASELINE_WINDOW]:
+            del self.history[old_tick]
+
+        # clients that acked the same tick get the same body, so encode it once
+        bodies = {}
+        sent = 0
+        for client in self.clients.values():
+            baseline_tick = client.acked_tick if client.acked_tick in self.history else 0
+            body = bodies.get(baseline_tick)
+            if body is None:
+                body = encode_body(tick, snapshot, baseline_tick, self.history.get(baseline_tick))
+                bodies[baseline_tick] = body
+            header = encode_snapshot_header(client.ship_id, client.last_applied, client.ship.timer)
+            packet = header + body
+            self.channel.send(packet, client.address)
+            client.bytes_sent += len(packet)
+            sent += len(packet)
+        self.snapshot_bytes.append(sent)
+
+    def tick(self):
+        start = time.perf_counter()
+        self.receive()
+        self.apply_inputs()
+        self.game.step(self.dt)
+        self.game.end_profiler_frame()
+        if self.game.frame % self.snapshot_interval == 0:
+            snapshot_start = time.perf_counter()
+            self.send_snapshots(self.game.frame)
+            self.snapshot_times.append((time.perf_counter() - snapshot_start) * 1000)
+        self.tick_times.append((time.perf_counter() - start) * 1000)
+
+    def stats(self):
+        tick_times = sorted(self.tick_times)
+        snapshot_times = sorted(self.snapshot_times)
+        ticks = len(self.snapshot_bytes) * self.snapshot_interval
+        # what every snapshot would cost without deltas, for comparison
+        full_bytes = len(encode_body(*self.last_snapshot)) if self.last_snapshot else 0
+        return {
+            "clients": len(self.clients),
+            "asteroids": len(self.game.asteroids),
+            "shots": len(self.game.shots),
+            "tick_ms_p50": percentile(tick_times, 0.50),
+            "tick_ms_p95": percentile(tick_times, 0.95),
+            "snapshot_ms_p50": percentile(snapshot_times, 0.50),
+            "snapshot_ms_p95": percentile(snapshot_times, 0.95),
+            "bytes_per_tick": sum(self.snapshot_bytes) / ticks if ticks else 0.0,
+            "full_snapshot_bytes": full_bytes,
+            "bad_packets": self.bad_packets,
+        }
+
+    def run(self, report_every=5.0):
+        next_tick = time.perf_counter()
+        next_report = next_tick + report_every
+        while True:
+            now = time.perf_counter()
+            if now < next_tick:
+                # keep delayed packets going out on time while we wait
+                self.channel.flush()
+                time.sleep(min(next_tick - now, 0.001))
+                continue
+            self.tick()
+            next_tick += self.dt
+            if now - next_tick > 1.0:
+                next_tick = now  # way behind, don't try to catch up
+            if now >= next_report:
+                next_report = now + report_every
+                print(format_stats(self.stats()))
+
+
+def format_stats(stats):
+    return (f"{stats['clients']} clients, {stats['asteroids']} asteroids, {stats['shots']} shots | "
+            f"tick p50 {stats['tick_ms_p50']:.2f}ms p95 {stats['tick_ms_p95']:.2f}ms | "
+            f"snapshot p50 {stats['snapshot_ms_p50']:.2f}ms | "
+            f"{stats['bytes_per_tick']:.0f} B/tick down (full snapshot {stats['full_snapshot_bytes']} B) | "
+            f"{stats['bad_packets']} bad packets")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run an Asteroids multiplayer server")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=NET_PORT)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--snapshot-interval", type=int, default=NET_SNAPSHOT_INTERVAL,
+                        help="ticks between snapshots")
+    parser.add_argument("--latency", type=float, default=0.0, help="fake one-way latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="extra random latency, up to this much")
+    parser.add_argument("--loss", type=float, default=0.0, help="fraction of packets to drop")
+    args = parser.parse_args()
+
+    pygame.init()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind((args.host, args.port))
+    channel = LossyChannel(sock, args.latency, args.jitter, args.loss)
+    server = NetServer(channel, args.seed, args.snapshot_interval)
+    print(f"Listening on {args.host}:{args.port}")
+    try:
+        server.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        channel.close()
+        pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# Runs a server and a bunch of bot clients in one process over real localhost
+# UDP sockets, with fake latency, jitter and packet loss on every link, then
+# reports bandwidth, server tick time and how far client prediction was off.
+#
+# Usage:
+#   python nettest.py --clients 8 --asteroids 300 --latency 0.05 --jitter 0.02 --loss 0.05
+import argparse
+import os
+import random
+import socket
+import statistics
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+from constants import *
+from policies import RandomPolicy
+from profiler import percentile
+from netcode import LossyChannel
+from netserver import NetServer, format_stats
+from netclient import NetClient
+
+
+def fill_asteroids(game, count, rng):
+    # keeps the field topped up to `count` rocks, on top of the normal spawns
+    while len(game.asteroids) < count:
+        position = pygame.Vector2(rng.uniform(0, SCREEN_WIDTH), rng.uniform(0, SCREEN_HEIGHT))
+        velocity = pygame.Vector2(rng.uniform(40, 100), 0).rotate(rng.uniform(0, 360))
+        game.asteroid_field.spawn(ASTEROID_MIN_RADIUS * rng.randint(1, ASTEROID_KINDS), position, velocity)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Localhost multiplayer test with a simulated bad network")
+    parser.add_argument("--clients", type=int, default=4)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--asteroids", type=int, default=0, help="keep at least this many asteroids alive")
+    parser.add_argument("--latency", type=float, default=0.05, help="one-way latency in seconds")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--loss", type=float, default=0.05)
+    parser.add_argument("--snapshot-interval", type=int, default=NET_SNAPSHOT_INTERVAL)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    pygame.init()
+    rng = random.Random(args.seed)
+    server_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    server_socket.bind(("127.0.0.1", 0))
+    server_address = server_socket.getsockname()
+    server = NetServer(LossyChannel(server_socket, args.latency, args.jitter, args.loss, args.seed),
+                       args.seed, args.snapshot_interval)
+    clients = []
+    for i in range(args.clients):
+        channel = LossyChannel(socket.socket(socket.AF_INET, socket.SOCK_DGRAM),
+                               args.latency, args.jitter, args.loss, args.seed + i + 1)
+        clients.append(NetClient(channel, server_address, RandomPolicy(args.seed + i)))
+
+    dt = 1 / SIMULATION_RATE
+    start = time.perf_counter()
+    next_tick = start
+    ticks = 0
+    while time.perf_counter() - start < args.seconds:
+        now = time.perf_counter()
+        if now < next_tick:
+            server.channel.flush()
+            for client in clients:
+                client.channel.flush()
+            time.sleep(min(next_tick - now, 0.001))
+            continue
+        if args.asteroids:
+            fill_asteroids(server.game, args.asteroids, rng)
+        server.tick()
+        for client in clients:
+            client.tick()
+        next_tick += dt
+        ticks += 1
+    elapsed = time.perf_counter() - start
+
+    stats = server.stats()
+    print(f"{ticks} ticks in {elapsed:.1f}s, latency {args.latency * 1000:.0f}ms "
+          f"+ up to {args.jitter * 1000:.0f}ms jitter, {args.loss:.0%} loss")
+    print("server: " + format_stats(stats))
+    if stats["full_snapshot_bytes"]:
+        snapshots_per_tick = 1 / args.snapshot_interval
+        full_per_tick = stats["full_snapshot_bytes"] * snapshots_per_tick * len(clients)
+        print(f"  full snapshots every time would be {full_per_tick:.0f} B/tick "
+              f"({full_per_tick / max(stats['bytes_per_tick'], 1):.1f}x)")
+    print(f"  dropped {server.channel.packets_dropped} of {server.channel.packets_sent} snapshot packets")
+
+    corrections = sorted(c for client in clients for c in client.corrections)
+    up_bytes = sum(client.channel.bytes_sent for client in clients)
+    print(f"clients: {up_bytes / ticks / len(clients):.1f} B/tick up each, "
+          f"{sum(client.snapshots_received for client in clients)} snapshots decoded, "
+          f"{sum(client.decode_failures for client in clients)} without a baseline")
+    if corrections:
+        print(f"  prediction error per snapshot: mean {statistics.mean(corrections):.2f}px, "
+              f"p95 {percentile(corrections, 0.95):.2f}px, max {corrections[-1]:.2f}px")
+
+    for client in clients:
+        client.channel.close()
+    server.channel.close()
+    pygame.quit()
+
+
+if __name__ == "__main__":
+    main()
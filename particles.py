@@ -0,0 +1,177 @@
+import math
+from typing import NamedTuple
+import numpy as np
+from constants import *
+
+
+# A copy of what draw() needs, so particles can be drawn on one thread while
+# they move on in another (see pipeline.py)
+class ParticleFrame(NamedTuple):
+    positions: np.ndarray  # (n, 2)
+    color_ids: np.ndarray
+    levels: np.ndarray  # fade level, PARTICLE_FADE_LEVELS - 1 is full brightness
+
+
+# Debris and thrust particles. There can be tens of thousands of them, so they
+# aren't sprites: every particle is a row in a few preallocated arrays, moved
+# with one array operation per tick and drawn straight into the screen's pixels.
+# Live particles are always rows [0, count), dead ones get swapped out from the end.
+# Purely cosmetic: they have their own random generator and aren't part of the
+# game state, so they never change how a seeded game plays out.
+class ParticleSystem:
+    def __init__(self, capacity=PARTICLE_CAPACITY, seed=None):
+        self.capacity = capacity
+        self.positions = np.zeros((capacity, 2), dtype=np.float32)
+        self.velocities = np.zeros((capacity, 2), dtype=np.float32)
+        self.ages = np.zeros(capacity, dtype=np.float32)
+        self.lifetimes = np.ones(capacity, dtype=np.float32)
+        # colours are indices into a small palette, faded in PARTICLE_FADE_LEVELS steps
+        self.color_ids = np.zeros(capacity, dtype=np.uint8)
+        self.palette = []
+        self.palette_table = None
+        self.palette_key = None
+        self.count = 0
+        self.dropped = 0  # particles that didn't fit, a hint the capacity is too small
+        self.fraction = 1.0  # share of requested particles emitted, lowered under load
+        self.rng = np.random.default_rng(seed)
+
+    def emit(self, x, y, count, speed, lifetime, color, direction=None, spread=180.0,
+             inherit=(0.0, 0.0), scatter=0.0):
+        """Emit count particles from (x, y).
+
+        speed and lifetime are (min, max) ranges. direction is a vector to fire
+        along (None = every way), give or take spread degrees. inherit is a
+        velocity added to every particle, scatter a radius to start them within.
+        """
+        if self.fraction < 1.0:
+            # rounded at random so small bursts still come out right on average
+            count = count * self.fraction + self.rng.random()
+        count = int(count)
+        room = self.capacity - self.count
+        if count > room:
+            self.dropped += count - room
+            count = room
+        if count <= 0:
+            return
+        rng = self.rng
+        start = self.count
+        end = start + count
+
+        heading = 0.0 if direction is None else math.atan2(direction[1], direction[0])
+        angles = heading + np.radians(rng.uniform(-spread, spread, count))
+        speeds = rng.uniform(speed[0], speed[1], count)
+        velocities = self.velocities[start:end]
+        velocities[:, 0] = np.cos(angles) * speeds + inherit[0]
+        velocities[:, 1] = np.sin(angles) * speeds + inherit[1]
+
+        positions = self.positions[start:end]
+        positions[:, 0] = x
+        positions[:, 1] = y
+        if scatter:
+            # uniform over a disc: sqrt keeps them from bunching in the middle
+            offsets = scatter * np.sqrt(rng.random(count))
+            offset_angles = rng.uniform(0, 2 * math.pi, count)
+            positions[:, 0] += np.cos(offset_angles) * offsets
+            positions[:, 1] += np.sin(offset_angles) * offsets
+
+        self.ages[start:end] = 0.0
+        self.lifetimes[start:end] = rng.uniform(lifetime[0], lifetime[1], count)
+        self.color_ids[start:end] = self.color_id(color)
+        self.count = end
+
+    def color_id(self, color):
+        color = tuple(color)
+        if color not in self.palette:
+            self.palette.append(color)
+        return self.palette.index(color)
+
+    def palette_for(self, screen):
+        # (colour, fade level) -> pixel value in the screen's format, rebuilt
+        # when the format or the palette changes
+        key = (screen.get_shifts(), len(self.palette))
+        if key != self.palette_key:
+            levels = np.linspace(0.0, 1.0, PARTICLE_FADE_LEVELS)
+            self.palette_table = np.array(
+                [[screen.map_rgb([round(c * level) for c in color]) for level in levels] for color in self.palette],
+                dtype=np.uint32,
+            )
+            self.palette_key = key
+        return self.palette_table
+
+    def explode(self, position, velocity, radius):
+        # an asteroid breaking up: bigger rocks throw out more debris
+        self.emit(position.x, position.y, radius * PARTICLE_DEBRIS_PER_RADIUS, PARTICLE_DEBRIS_SPEED,
+                  PARTICLE_DEBRIS_LIFETIME, PARTICLE_DEBRIS_COLOR, inherit=velocity * 0.5,
+                  scatter=radius * 0.5)
+
+    def thrust(self, position, forward, radius):
+        # exhaust out of the back of the ship, forward is the way it's moving
+        nozzle = position - forward * radius
+        self.emit(nozzle.x, nozzle.y, PARTICLE_THRUST_PER_TICK, PARTICLE_THRUST_SPEED,
+                  PARTICLE_THRUST_LIFETIME, PARTICLE_THRUST_COLOR, direction=-forward,
+                  spread=PARTICLE_THRUST_SPREAD)
+
+    def update(self, dt):
+        n = self.count
+        if n == 0:
+            return
+        self.velocities[:n] *= max(0.0, 1.0 - PARTICLE_DRAG * dt)
+        self.positions[:n] += self.velocities[:n] * dt
+        self.ages[:n] += dt
+
+        dead = self.ages[:n] >= self.lifetimes[:n]
+        dead_count = int(np.count_nonzero(dead))
+        if dead_count == 0:
+            return
+        # swap-remove, all at once: the survivors past the new end move into
+        # the holes before it (there are exactly as many of each)
+        keep = n - dead_count
+        holes = np.flatnonzero(dead[:keep])
+        movers = keep + np.flatnonzero(~dead[keep:])
+        for array in (self.positions, self.velocities, self.ages, self.lifetimes, self.color_ids):
+            array[holes] = array[movers]
+        self.count = keep
+
+    def fade_levels(self, rows):
+        return ((1.0 - self.ages[rows] / self.lifetimes[rows]) * (PARTICLE_FADE_LEVELS - 1)).astype(np.intp)
+
+    def capture(self):
+        n = self.count
+        return ParticleFrame(self.positions[:n].copy(), self.color_ids[:n].copy(), self.fade_levels(slice(0, n)))
+
+    def draw(self, screen, scale=1.0, frame=None):
+        # every particle is one pixel, fading out over its lifetime, written
+        # straight into the surface's pixel buffer in one go instead of a draw
+        # call each. Plain pixels keep it to one scattered write per particle.
+        # screen has to be 32 bits per pixel, which the display always is here.
+        # scale is pixels per world unit. frame is a ParticleFrame from
+        # capture() to draw instead of the live particles
+        if frame is None:
+            positions = self.positions[:self.count]
+            color_ids = self.color_ids
+        else:
+            positions = frame.positions
+            color_ids = frame.color_ids
+        if len(positions) == 0:
+            return
+        width, height = screen.get_size()
+        if scale != 1.0:
+            xs = (positions[:, 0] * scale).astype(np.intp)
+            ys = (positions[:, 1] * scale).astype(np.intp)
+        else:
+            xs = positions[:, 0].astype(np.intp)
+            ys = positions[:, 1].astype(np.intp)
+        visible = np.flatnonzero((xs >= 0) & (xs < width) & (ys >= 0) & (ys < height))
+        xs = xs[visible]
+        ys = ys[visible]
+        levels = self.fade_levels(visible) if frame is None else frame.levels[visible]
+        values = self.palette_for(screen)[color_ids[visible], levels]
+
+        # the display (and anything converted to match it) is 32 bits per pixel
+        buffer = screen.get_buffer()
+        pixels = np.frombuffer(buffer, dtype=np.uint32)
+        pixels[ys * (screen.get_pitch() // 4) + xs] = values
+        del pixels, buffer
+
+    def clear(self):
+        self.count = 0
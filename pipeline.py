@@ -0,0 +1,78 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+
+# Everything the main thread needs to draw one frame, captured on the
+# simulation thread (Game.capture_frame). Nothing in it is touched again once
+# it's captured, so it can be drawn while the simulation moves on
+class RenderFrame(NamedTuple):
+    tick: int  # game.frame it was captured at
+    blits: list  # (surface, position) pairs looked up in the sprite atlas
+    particles: object  # a ParticleFrame, or None
+    score: int
+
+
+# Runs the simulation on a worker thread, one job per frame, while the main
+# thread draws the frame the previous job captured. Two frames are in play:
+# front is being drawn, the running job produces the next one and wait()
+# swaps it in. SDL events and the display stay on the main thread, and the
+# game is only ever touched by one thread at a time apart from the job.
+class SimulationPipeline:
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation")
+        self.front = None
+        self.pending = None
+        self.frames = 0
+        # seconds, for stats(): how long the worker spent on jobs (wall and
+        # CPU) and how long the main thread sat blocked waiting for them
+        self.started = time.perf_counter()
+        self.main_cpu_start = time.thread_time()
+        self.worker_busy = 0.0
+        self.worker_cpu = 0.0
+        self.wait_time = 0.0
+
+    def submit(self, job):
+        """Start job() on the worker. It has to return the next RenderFrame"""
+        self.pending = self.executor.submit(self.run_job, job)
+
+    def run_job(self, job):
+        start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            return job()
+        finally:
+            self.worker_cpu += time.thread_time() - cpu_start
+            self.worker_busy += time.perf_counter() - start
+
+    def wait(self):
+        """Block until the running job is done and make its frame the front one"""
+        start = time.perf_counter()
+        # re-raises anything the job raised, here on the main thread
+        frame = self.pending.result()
+        self.wait_time += time.perf_counter() - start
+        self.pending = None
+        self.front = frame
+        self.frames += 1
+        return frame
+
+    def stats(self):
+        """Share of wall time each thread was busy (and on the CPU), and the handoff wait.
+
+        The main thread counts as busy whenever it isn't waiting on the
+        simulation, frame cap included, so its CPU share is the one to look at.
+        """
+        wall = max(time.perf_counter() - self.started, 1e-9)
+        return {
+            "frames": self.frames,
+            "main_busy": (wall - self.wait_time) / wall,
+            "main_cpu": (time.thread_time() - self.main_cpu_start) / wall,
+            "worker_busy": self.worker_busy / wall,
+            "worker_cpu": self.worker_cpu / wall,
+            "wait_ms_per_frame": self.wait_time * 1000 / max(self.frames, 1),
+        }
+
+    def close(self):
+        if self.pending is not None:
+            self.wait()
+        self.executor.shutdown()
@@ -1,40 +1,66 @@
 from circleshape import *
 from constants import *
 from shots import *
+from inputsource import KeyboardInput
 
 class Player(CircleShape):
+    # the class used for new shots, Game swaps this out for the entity store
+    shot_class = Shot
+    # where the controls come from each tick, Game can swap in a scripted source
+    input_source = KeyboardInput()
+    # ParticleSystem for the exhaust trail, Game sets this when it draws anything
+    particles = None
+
     def __init__(self, x, y):
         super().__init__(x, y, PLAYER_RADIUS)
         self.rotation = 0
         self.timer = 0
+        self.shots_fired = 0
+        self.previous_rotation = 0
 
     # in the player class
-    def triangle(self):
-        forward = pygame.Vector2(0, 1).rotate(self.rotation)
-        right = pygame.Vector2(0, 1).rotate(self.rotation + 90) * self.radius / 1.5
-        a = self.position + forward * self.radius
-        b = self.position - forward * self.radius - right
-        c = self.position - forward * self.radius + right
+    def triangle(self, alpha=1.0):
+        position = self.render_position(alpha)
+        rotation = self.render_rotation(alpha)
+        forward = pygame.Vector2(0, 1).rotate(rotation)
+        right = pygame.Vector2(0, 1).rotate(rotation + 90) * self.radius / 1.5
+        a = position + forward * self.radius
+        b = position - forward * self.radius - right
+        c = position - forward * self.radius + right
         return [a, b, c]
     
-    def draw(self, screen):
-        pygame.draw.polygon(screen, "white", self.triangle(), 2)
+    def draw(self, screen, alpha=1.0):
+        pygame.draw.polygon(screen, "white", [point * self.draw_scale for point in self.triangle(alpha)], self.outline_width)
         
+    def blit_item(self, atlas, alpha=1.0):
+        surface, half = atlas.ship(self.render_rotation(alpha))
+        position = self.render_position(alpha) * atlas.scale
+        return (surface, (position.x - half, position.y - half))
+
+    def save_previous_state(self):
+        super().save_previous_state()
+        self.previous_rotation = self.rotation
+
+    def render_rotation(self, alpha=1.0):
+        if alpha >= 1.0:
+            return self.rotation
+        return self.previous_rotation + (self.rotation - self.previous_rotation) * alpha
+
     def rotate(self, dt):
         self.rotation += PLAYER_TURN_SPEED * dt
 
     def update(self, dt):
-        keys = pygame.key.get_pressed()
+        controls = self.input_source.read()
 
-        if keys[pygame.K_a]:
+        if controls.left:
             self.rotate(-dt)
-        if keys[pygame.K_d]:
+        if controls.right:
             self.rotate(dt)
-        if keys[pygame.K_w]:
+        if controls.forward:
             self.move(dt)
-        if keys[pygame.K_s]:
+        if controls.backward:
             self.move(-dt)
-        if keys[pygame.K_SPACE]:
+        if controls.shoot:
             if self.timer <= 0:
                 self.shoot()
                 self.timer = PLAYER_SHOOT_COOLDOWN
@@ -45,8 +71,13 @@ class Player(CircleShape):
     def move(self, dt):
         forward = pygame.Vector2(0, 1).rotate(self.rotation)
         self.position += forward * PLAYER_SPEED * dt
+        if self.particles is not None:
+            # backing up (negative dt) blows the exhaust out of the nose instead
+            self.particles.thrust(self.position, forward if dt > 0 else -forward, self.radius)
     
     def shoot(self):
         #position is a Vector2 argument, you can access the indivual coordinate by .x and .y 
-        shot = Shot(self.position.x, self.position.y)
+        shot = self.shot_class.create(self.position.x, self.position.y)
         shot.velocity = pygame.Vector2(0,1).rotate(self.rotation) * PLAYER_SHOOT_SPEED
+        self.shots_fired += 1
+        return shot
@@ -0,0 +1,78 @@
+import random
+import pygame
+from constants import *
+from inputsource import Controls, NO_CONTROLS, ScriptedInput, DEMO_SCRIPT
+
+# Bot players for headless runs. They're input sources like KeyboardInput,
+# so read() returns one Controls per tick. Bots that need to look at the game
+# get it through bind(game) once the Game exists.
+
+
+class IdlePolicy:
+    def read(self):
+        return NO_CONTROLS
+
+
+class RandomPolicy:
+    """Mashes random buttons, holding each combination for a few ticks"""
+
+    def __init__(self, seed, hold_ticks=10):
+        self.rng = random.Random(seed)
+        self.hold_ticks = hold_ticks
+        self.ticks_left = 0
+        self.controls = NO_CONTROLS
+
+    def read(self):
+        if self.ticks_left <= 0:
+            self.controls = Controls.from_bits(self.rng.randrange(32))
+            self.ticks_left = self.hold_ticks
+        self.ticks_left -= 1
+        return self.controls
+
+
+class AimPolicy:
+    """Turns towards the nearest asteroid, shoots when lined up, backs off when it gets close"""
+
+    def __init__(self, seed=None, aim_tolerance=5, danger_distance=120):
+        self.aim_tolerance = aim_tolerance
+        self.danger_distance = danger_distance
+        self.game = None
+
+    def bind(self, game):
+        self.game = game
+
+    def read(self):
+        player = self.game.player
+        nearest = None
+        nearest_distance = None
+        for asteroid in self.game.asteroids:
+            distance = player.position.distance_squared_to(asteroid.position)
+            if nearest is None or distance < nearest_distance:
+                nearest = asteroid
+                nearest_distance = distance
+        if nearest is None:
+            return NO_CONTROLS
+
+        direction = nearest.position - player.position
+        target = pygame.Vector2(0, 1).angle_to(direction)
+        # smallest signed angle from where we're facing to the target
+        offset = (target - player.rotation + 180) % 360 - 180
+        too_close = nearest_distance < (self.danger_distance + nearest.radius) ** 2
+        return Controls(
+            left=offset < -self.aim_tolerance,
+            right=offset > self.aim_tolerance,
+            backward=too_close,
+            shoot=abs(offset) <= self.aim_tolerance * 2,
+        )
+
+
+POLICIES = {
+    "idle": lambda seed: IdlePolicy(),
+    "demo": lambda seed: ScriptedInput(DEMO_SCRIPT),
+    "random": lambda seed: RandomPolicy(seed),
+    "aim": lambda seed: AimPolicy(seed),
+}
+
+
+def make_policy(name, seed):
+    return POLICIES[name](seed)
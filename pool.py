@@ -0,0 +1,38 @@
+from constants import *
+
+
+# Free list of dead shapes of one class, so shooting and splitting can reuse
+# old objects instead of allocating new ones every time.
+# Released shapes only become reusable after recycle() (called once per tick),
+# because a shape killed mid-frame can still be read, e.g. by Asteroid.split.
+class ShapePool:
+    def __init__(self, cls, max_size=POOL_MAX_SIZE):
+        self.cls = cls
+        self.max_size = max_size
+        self.free = []
+        self.pending = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self, *args):
+        if self.free:
+            shape = self.free.pop()
+            shape.reset(*args)
+            shape.add(*shape.containers)
+            self.reused += 1
+        else:
+            shape = self.cls(*args)
+            self.created += 1
+        return shape
+
+    def release(self, shape):
+        self.pending.append(shape)
+
+    def recycle(self):
+        room = self.max_size - len(self.free)
+        self.free.extend(self.pending[:room])
+        self.pending.clear()
+
+    def clear(self):
+        self.free.clear()
+        self.pending.clear()
@@ -0,0 +1,131 @@
+import csv
+import json
+import threading
+import time
+from collections import deque
+from constants import *
+
+# The phases of a frame, in the order they happen in Game.run
+PHASES = ("events", "update", "collisions", "cull", "snapshot", "particles", "draw", "flip")
+
+
+class PhaseTimer:
+    # tiny context manager so timing a phase is just `with profiler.phase(...)`
+    __slots__ = ("profiler", "name", "start")
+
+    def __init__(self, profiler, name):
+        self.profiler = profiler
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+
+    def __exit__(self, *exc):
+        self.profiler.add(self.name, time.perf_counter_ns() - self.start)
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(fraction * len(sorted_values)))
+    return sorted_values[index]
+
+
+# Times each phase of every frame, keeps a rolling window for p50/p95/p99 and
+# can stream one record per frame to a .jsonl or .csv file
+class FrameProfiler:
+    def __init__(self, window=PROFILER_WINDOW, output_path=None):
+        self.window = window
+        self.samples = {name: deque(maxlen=window) for name in PHASES + ("frame",)}
+        self.current = dict.fromkeys(PHASES, 0)
+        # phases can be timed from the simulation thread too (pipelined mode)
+        self.lock = threading.Lock()
+        self.counts = {}
+        self.frames = 0
+        self.overlay_visible = False
+        self.overlay_lines = []
+        self.output_file = None
+        self.csv_writer = None
+        if output_path is not None:
+            self.open_output(output_path)
+
+    def open_output(self, path):
+        self.output_file = open(path, "w", newline="")
+        if path.endswith(".csv"):
+            self.csv_writer = csv.writer(self.output_file)
+            self.header_written = False
+
+    def phase(self, name):
+        return PhaseTimer(self, name)
+
+    def add(self, name, nanoseconds):
+        with self.lock:
+            self.current[name] = self.current.get(name, 0) + nanoseconds
+
+    def end_frame(self, counts, total_ms=None):
+        """Close off the current frame. counts is a dict of entity counts etc.
+
+        total_ms defaults to the sum of the phases, which overstates it when
+        phases ran side by side on two threads.
+        """
+        phase_ms = {name: self.current.get(name, 0) / 1e6 for name in PHASES}
+        if total_ms is None:
+            total_ms = sum(phase_ms.values())
+        for name, ms in phase_ms.items():
+            self.samples[name].append(ms)
+        self.samples["frame"].append(total_ms)
+        self.counts = counts
+        if self.output_file is not None:
+            self.write_record(phase_ms, total_ms, counts)
+        self.current = dict.fromkeys(PHASES, 0)
+        self.frames += 1
+
+    def discard_frame(self):
+        # for frames we don't want in the stats (menus)
+        self.current = dict.fromkeys(PHASES, 0)
+
+    def write_record(self, phase_ms, total_ms, counts):
+        if self.csv_writer is None:
+            record = {"frame": self.frames, "total_ms": total_ms, "phases": phase_ms, "counts": counts}
+            self.output_file.write(json.dumps(record) + "\n")
+            return
+        if not self.header_written:
+            self.csv_writer.writerow(["frame", "total_ms", *PHASES, *counts.keys()])
+            self.header_written = True
+        self.csv_writer.writerow([self.frames, total_ms, *phase_ms.values(), *counts.values()])
+
+    def stats(self):
+        """p50/p95/p99 in ms for every phase over the rolling window"""
+        result = {}
+        for name, values in self.samples.items():
+            ordered = sorted(values)
+            result[name] = {
+                "p50": percentile(ordered, 0.50),
+                "p95": percentile(ordered, 0.95),
+                "p99": percentile(ordered, 0.99),
+            }
+        return result
+
+    def toggle_overlay(self):
+        self.overlay_visible = not self.overlay_visible
+
+    def draw_overlay(self, screen, text_cache):
+        # re-rendering text every frame would cost more than most phases, so
+        # the numbers only refresh a few times a second
+        if self.frames % PROFILER_OVERLAY_REFRESH == 0 or not self.overlay_lines:
+            lines = ["phase        p50    p95    p99"]
+            for name, values in self.stats().items():
+                lines.append(f"{name:<10} {values['p50']:6.2f} {values['p95']:6.2f} {values['p99']:6.2f}")
+            lines.append(" ".join(f"{name}={count}" for name, count in self.counts.items()))
+            self.overlay_lines = lines
+
+        y = 10
+        for line in self.overlay_lines:
+            text = text_cache.render(line, 20, (0, 255, 0))
+            screen.blit(text, (screen.get_width() - text.get_width() - 10, y))
+            y += 18
+
+    def close(self):
+        if self.output_file is not None:
+            self.output_file.close()
+            self.output_file = None
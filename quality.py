@@ -0,0 +1,81 @@
+from collections import deque
+from typing import NamedTuple
+from constants import *
+from profiler import percentile
+
+
+class QualityLevel(NamedTuple):
+    outline_width: int  # px, for asteroid/shot/ship outlines
+    shot_dots: bool  # draw shots as plain squares instead of outlined circles
+    particle_fraction: float  # share of particles that actually get emitted
+    hud_interval: int  # frames between HUD text refreshes
+    render_scale: float  # world resolution, on top of Game.render_scale
+
+
+# Best first. Each step gives up a bit more of what's cheapest to lose
+QUALITY_LEVELS = (
+    QualityLevel(2, False, 1.0, 1, 1.0),
+    QualityLevel(1, False, 0.5, 2, 1.0),
+    QualityLevel(1, True, 0.25, 4, 0.75),
+    QualityLevel(1, True, 0.1, 8, 0.5),
+)
+
+
+# Watches how long frames take to produce and steps QUALITY_LEVELS down when
+# they don't fit the budget, back up once there's room again. Dropping is quick
+# and recovering slow, so a load hovering near the budget doesn't flip-flop.
+class QualityGovernor:
+    def __init__(self, budget_ms=QUALITY_FRAME_BUDGET_MS, window=QUALITY_WINDOW, levels=QUALITY_LEVELS):
+        self.budget_ms = budget_ms
+        self.levels = levels
+        self.level = 0
+        self.frame_times = deque(maxlen=window)
+        self.windows_with_headroom = 0
+        self.frames = 0
+        self.frames_at_level = [0] * len(levels)
+        # every change made: dicts of frame, old and new level, and the frame
+        # time (ms, QUALITY_PERCENTILE over the window) it was based on
+        self.decisions = []
+
+    @property
+    def settings(self):
+        return self.levels[self.level]
+
+    def record(self, frame_ms):
+        """Feed in one frame's time, returns True if the level changed"""
+        self.frames += 1
+        self.frames_at_level[self.level] += 1
+        self.frame_times.append(frame_ms)
+        if len(self.frame_times) < self.frame_times.maxlen:
+            return False
+        measured = percentile(sorted(self.frame_times), QUALITY_PERCENTILE)
+
+        if measured > self.budget_ms and self.level < len(self.levels) - 1:
+            return self.change(self.level + 1, measured)
+        if measured < self.budget_ms * QUALITY_HEADROOM and self.level > 0:
+            # only step up after several windows in a row had room to spare
+            self.windows_with_headroom += 1
+            if self.windows_with_headroom >= QUALITY_RECOVERY_WINDOWS:
+                return self.change(self.level - 1, measured)
+        else:
+            self.windows_with_headroom = 0
+        # judge the next window on fresh frames only
+        self.frame_times.clear()
+        return False
+
+    def change(self, level, measured):
+        self.decisions.append({"frame": self.frames, "from": self.level, "to": level, "frame_ms": measured})
+        self.level = level
+        self.windows_with_headroom = 0
+        self.frame_times.clear()
+        return True
+
+    def summary(self):
+        """Share of frames spent at each level and how many changes were made"""
+        frames = max(self.frames, 1)
+        return {
+            "level": self.level,
+            "changes": len(self.decisions),
+            "degrades": sum(1 for decision in self.decisions if decision["to"] > decision["from"]),
+            "time_at_level": [count / frames for count in self.frames_at_level],
+        }
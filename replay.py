@@ -0,0 +1,190 @@
+import json
+import struct
+import zlib
+from constants import *
+from inputsource import Controls, NO_CONTROLS
+from waves import WaveSchedule
+
+# Replay file layout (little endian):
+#   header: magic, version, seed, simulation rate, tick count, checksum interval,
+#           swept collisions flag (the two collision modes play out differently)
+#   then a zlib-compressed body of varints: the run-length encoded input log as
+#   (bits, run length) pairs, followed by the checksums as (tick delta, crc32),
+#   then the wave script as length-prefixed JSON (empty for the classic spawner)
+REPLAY_MAGIC = b"ASTR"
+REPLAY_VERSION = 3
+HEADER = struct.Struct("<4sBqHIH?")
+
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(data, offset):
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return value, offset
+        shift += 7
+
+
+def state_checksum(game):
+    return zlib.crc32(game.state_hash().encode())
+
+
+class Replay:
+    """A seed plus every tick's inputs, with periodic state checksums"""
+
+    def __init__(self, seed, simulation_rate, checksum_interval=REPLAY_CHECKSUM_INTERVAL,
+                 swept_collisions=USE_SWEPT_COLLISIONS, waves=None):
+        self.seed = seed
+        self.simulation_rate = simulation_rate
+        self.checksum_interval = checksum_interval
+        self.swept_collisions = swept_collisions
+        self.waves = waves  # the game's WaveSchedule, None for the classic one
+        self.runs = []  # [bits, run length]
+        self.checksums = []  # (tick, crc32)
+        self.ticks = 0
+
+    def append(self, bits):
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+        self.ticks += 1
+
+    def to_bytes(self):
+        body = bytearray()
+        write_varint(body, len(self.runs))
+        for bits, run in self.runs:
+            body.append(bits)
+            write_varint(body, run)
+        write_varint(body, len(self.checksums))
+        last_tick = 0
+        for tick, checksum in self.checksums:
+            write_varint(body, tick - last_tick)
+            body += struct.pack("<I", checksum)
+            last_tick = tick
+        script = json.dumps(self.waves.to_dict()).encode() if self.waves is not None else b""
+        write_varint(body, len(script))
+        body += script
+        header = HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, self.seed, self.simulation_rate,
+                             self.ticks, self.checksum_interval, self.swept_collisions)
+        return header + zlib.compress(bytes(body), 9)
+
+    @classmethod
+    def from_bytes(cls, data):
+        magic, version, seed, simulation_rate, ticks, checksum_interval, swept_collisions = HEADER.unpack_from(data)
+        if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+            raise ValueError("not an asteroids replay file (or an unsupported version)")
+        replay = cls(seed, simulation_rate, checksum_interval, swept_collisions)
+        replay.ticks = ticks
+
+        body = zlib.decompress(data[HEADER.size:])
+        count, offset = read_varint(body, 0)
+        for _ in range(count):
+            bits = body[offset]
+            run, offset = read_varint(body, offset + 1)
+            replay.runs.append([bits, run])
+        count, offset = read_varint(body, offset)
+        tick = 0
+        for _ in range(count):
+            delta, offset = read_varint(body, offset)
+            tick += delta
+            replay.checksums.append((tick, struct.unpack_from("<I", body, offset)[0]))
+            offset += 4
+        length, offset = read_varint(body, offset)
+        if length:
+            replay.waves = WaveSchedule.from_dict(json.loads(body[offset:offset + length]))
+        return replay
+
+    def save(self, path):
+        with open(path, "wb") as file:
+            file.write(self.to_bytes())
+
+    @classmethod
+    def load(cls, path):
+        with open(path, "rb") as file:
+            return cls.from_bytes(file.read())
+
+
+# Wraps the real input source and logs what it returns, one entry per tick.
+# Also a tick listener on the game so it can store state checksums
+class ReplayRecorder:
+    def __init__(self, source, seed, simulation_rate):
+        self.source = source
+        self.replay = Replay(seed, simulation_rate)
+        self.recording = True
+        self.game = None  # the game being recorded, for the last checksum on save
+
+    def read(self):
+        controls = self.source.read()
+        if self.recording:
+            self.replay.append(controls.to_bits())
+        return controls
+
+    def on_tick(self, game):
+        if not self.recording:
+            return
+        self.game = game
+        # a replay covers one game, from the seed to the first game over
+        over = game.game_state != "playing"
+        # the final state always gets a checksum too, or short games (and the
+        # end of long ones) would go unchecked
+        if game.frame % self.replay.checksum_interval == 0 or over:
+            self.add_checksum(game)
+        if over:
+            self.recording = False
+
+    def add_checksum(self, game):
+        checksums = self.replay.checksums
+        if not checksums or checksums[-1][0] != game.frame:
+            checksums.append((game.frame, state_checksum(game)))
+
+    def save(self, path):
+        # cut short (frame limit, window closed) while still playing: check where it got to
+        if self.recording and self.game is not None:
+            self.add_checksum(self.game)
+        self.replay.save(path)
+
+
+# Feeds a recorded log back in as the player's input, and checks the game
+# against the stored checksums as it goes
+class ReplayInput:
+    def __init__(self, replay):
+        self.replay = replay
+        self.run_index = 0
+        self.left_in_run = replay.runs[0][1] if replay.runs else 0
+        self.checksums = dict(replay.checksums)
+        self.checked = 0
+        self.diverged_at = None  # first tick whose checksum didn't match
+
+    @property
+    def finished(self):
+        return self.run_index >= len(self.replay.runs)
+
+    def read(self):
+        if self.finished:
+            return NO_CONTROLS
+        bits = self.replay.runs[self.run_index][0]
+        self.left_in_run -= 1
+        if self.left_in_run == 0:
+            self.run_index += 1
+            if not self.finished:
+                self.left_in_run = self.replay.runs[self.run_index][1]
+        return Controls.from_bits(bits)
+
+    def on_tick(self, game):
+        expected = self.checksums.get(game.frame)
+        if expected is None:
+            return
+        self.checked += 1
+        if self.diverged_at is None and state_checksum(game) != expected:
+            self.diverged_at = game.frame
@@ -0,0 +1,158 @@
+import bisect
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from constants import *
+
+# Scores live next to the game files, not wherever the game was started from
+GAME_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# The best K scores, kept sorted (highest first) so checking whether a score
+# makes the table is a single comparison against the last entry
+class TopScores:
+    def __init__(self, k=HIGH_SCORE_COUNT):
+        self.k = k
+        self.entries = []  # (name, score), best first
+        self.keys = []  # -score for each entry, ascending, for bisect
+
+    def qualifies(self, score):
+        return len(self.entries) < self.k or score > self.entries[-1][1]
+
+    def insert(self, name, score):
+        # ties go after existing entries, like a stable sort would put them
+        index = bisect.bisect_right(self.keys, -score)
+        if index >= self.k:
+            return
+        self.entries.insert(index, (name, score))
+        self.keys.insert(index, -score)
+        del self.entries[self.k:]
+        del self.keys[self.k:]
+
+
+# Keeps everything in memory, for headless runs and anything else that
+# shouldn't touch the disk
+class MemoryScoreStore:
+    def __init__(self, k=HIGH_SCORE_COUNT):
+        self.top_scores = TopScores(k)
+        self.all_scores = []
+
+    def top(self):
+        return list(self.top_scores.entries)
+
+    def qualifies(self, score):
+        return self.top_scores.qualifies(score)
+
+    def add(self, name, score):
+        self.top_scores.insert(name, score)
+        self.all_scores.append((name, score, time.time()))
+
+    def history(self, name, limit=20):
+        """Most recent scores for one player as (score, timestamp), newest first"""
+        scores = [(score, when) for who, score, when in self.all_scores if who == name]
+        return scores[::-1][:limit]
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+# SQLite-backed store. Every score is its own committed transaction, so a crash
+# can't leave a half-written file behind. Writes happen on a background thread,
+# the game thread only ever touches the in-memory top K.
+class SQLiteScoreStore(MemoryScoreStore):
+    def __init__(self, path=None, k=HIGH_SCORE_COUNT, legacy_json_path=None):
+        super().__init__(k)
+        self.path = path or os.path.join(GAME_DIR, HIGH_SCORE_DB)
+        legacy_json_path = legacy_json_path or os.path.join(GAME_DIR, "high_scores.json")
+
+        connection = self.connect()
+        with connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS scores ("
+                "id INTEGER PRIMARY KEY, name TEXT NOT NULL, score INTEGER NOT NULL, created REAL NOT NULL)"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS scores_by_score ON scores (score DESC, id)")
+            connection.execute("CREATE INDEX IF NOT EXISTS scores_by_name ON scores (name, created DESC)")
+            # bring over scores from the old json file the first time we run
+            if connection.execute("SELECT COUNT(*) FROM scores").fetchone()[0] == 0:
+                for name, score in load_legacy_json(legacy_json_path):
+                    connection.execute(
+                        "INSERT INTO scores (name, score, created) VALUES (?, ?, ?)", (name, score, time.time())
+                    )
+        # only the top K are loaded, the rest stays on disk
+        for name, score in connection.execute("SELECT name, score FROM scores ORDER BY score DESC, id LIMIT ?", (k,)):
+            self.top_scores.insert(name, score)
+        connection.close()
+
+        self.writes = queue.Queue()
+        self.failed_writes = 0
+        self.writer = threading.Thread(target=self.write_loop, name="score-writer", daemon=True)
+        self.writer.start()
+
+    def connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        return connection
+
+    def write_loop(self):
+        # sqlite connections belong to the thread that made them
+        connection = None
+        while True:
+            item = self.writes.get()
+            try:
+                if item is None:
+                    break
+                name, score, created = item
+                if connection is None:
+                    connection = self.connect()
+                with connection:
+                    connection.execute("INSERT INTO scores (name, score, created) VALUES (?, ?, ?)",
+                                       (name, score, created))
+            except sqlite3.Error as error:
+                # locked or read-only database, full disk... The score is still in
+                # the in-memory table, and the thread has to live on for the next one
+                self.failed_writes += 1
+                print(f"Couldn't save score {score} for {name}: {error}")
+            finally:
+                # or flush() and close() would wait forever
+                self.writes.task_done()
+        if connection is not None:
+            connection.close()
+
+    def add(self, name, score):
+        self.top_scores.insert(name, score)
+        self.writes.put((name, score, time.time()))
+
+    def history(self, name, limit=20):
+        """Most recent scores for one player as (score, timestamp), newest first"""
+        connection = self.connect()
+        rows = connection.execute(
+            "SELECT score, created FROM scores WHERE name = ? ORDER BY created DESC LIMIT ?", (name, limit)
+        ).fetchall()
+        connection.close()
+        return rows
+
+    def flush(self):
+        """Block until every queued score is on disk"""
+        self.writes.join()
+
+    def close(self, timeout=5.0):
+        if self.writer.is_alive():
+            self.writes.put(None)
+            self.writer.join(timeout)
+            if self.writer.is_alive():
+                print(f"Score writer still busy after {timeout}s, some scores may not be saved")
+
+
+def load_legacy_json(path):
+    try:
+        with open(path, "r") as file:
+            return [(name, score) for name, score in json.loads(file.read())]
+    except (FileNotFoundError, json.JSONDecodeError, ValueError, TypeError):
+        return []
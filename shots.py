@@ -2,11 +2,29 @@ from circleshape import *
 from constants import *
 
 class Shot(CircleShape):
+    ttl = SHOT_LIFETIME
+    # plain squares instead of outlined circles, cheaper when there are lots of them
+    dots = False
+
     def __init__(self, x, y):
         super().__init__(x, y, SHOT_RADIUS)
+
+    def reset(self, x, y):
+        super().reset(x, y, SHOT_RADIUS)
     
-    def draw(self, screen):
-        pygame.draw.circle(screen, "white", self.position, self.radius, 2)
+    def draw(self, screen, alpha=1.0):
+        position = self.screen_position(alpha)
+        if self.dots:
+            screen.fill("white", (position.x - 1, position.y - 1, 3, 3))
+            return
+        pygame.draw.circle(screen, "white", position, self.radius * self.draw_scale, self.outline_width)
+
+    def blit_item(self, atlas, alpha=1.0):
+        if not self.dots:
+            return super().blit_item(atlas, alpha)
+        position = self.render_position(alpha) * atlas.scale
+        return (atlas.dot, (position.x - 1, position.y - 1))
     
     def update(self, dt):
-        self.position += self.velocity * dt
\ No newline at end of file
+        self.position += self.velocity * dt
+        self.age += dt
\ No newline at end of file
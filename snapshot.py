@@ -0,0 +1,168 @@
+import struct
+from collections import deque
+import numpy as np
+from constants import *
+
+# Binary snapshot of everything the simulation needs to carry on exactly where
+# it was (little endian):
+#   header: magic, version, game over flag, frame, score, culled count, player x, y, rotation,
+#           gun timer, shots fired, spawn timer, asteroids spawned, wave time,
+#           spawn table key, asteroid count, shot count
+#   rng:    gauss_next flag and value, then the 625 words of Mersenne Twister state
+#   asteroids: x, y, vx, vy, radius, age per asteroid, as doubles in group order
+#   shots:     x, y, vx, vy, age per shot
+# Group order is part of the state: collisions and splits resolve in that order.
+# Input sources keep their own state and aren't included.
+SNAPSHOT_MAGIC = b"ASTS"
+SNAPSHOT_VERSION = 2
+HEADER = struct.Struct("<4sB?qqq4dqdqdQII")
+RNG_STATE = struct.Struct("<?d625I")
+ASTEROID_FIELDS = 6
+SHOT_FIELDS = 5
+
+
+def pack_group(group, store, fields):
+    if store is not None:
+        # stored shapes: pull the columns straight out of the arrays
+        slots = np.fromiter((shape.slot for shape in group), dtype=np.intp, count=len(group))
+        columns = [store.positions[slots], store.velocities[slots]]
+        if fields == ASTEROID_FIELDS:
+            columns.append(store.radii[slots, None])
+        columns.append(store.ages[slots, None])
+        return np.hstack(columns).astype("<f8").tobytes()
+    values = []
+    if fields == ASTEROID_FIELDS:
+        for shape in group:
+            values += (*shape.position, *shape.velocity, shape.radius, shape.age)
+    else:
+        for shape in group:
+            values += (*shape.position, *shape.velocity, shape.age)
+    return struct.pack(f"<{len(values)}d", *values)
+
+
+def save_state(game):
+    player = game.player
+    field = game.asteroid_field
+    version, words, gauss_next = game.rng.getstate()
+    return b"".join((
+        HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, game.game_state == "game_over", game.frame, game.score, game.culled_count,
+            player.position.x, player.position.y, player.rotation, player.timer, player.shots_fired,
+            field.spawn_timer, field.spawned, field.elapsed, field.table_key, len(game.asteroids), len(game.shots),
+        ),
+        RNG_STATE.pack(gauss_next is not None, gauss_next or 0.0, *words),
+        pack_group(game.asteroids, game.entity_store, ASTEROID_FIELDS),
+        pack_group(game.shots, game.entity_store, SHOT_FIELDS),
+    ))
+
+
+def restore_group(group, create, records, store):
+    """records is a (count, fields) array, in the order the group should end up in"""
+    # Reuse the shapes already in the group (keeping their order), kill the
+    # extras or create the missing ones at the end. Rewinding every frame then
+    # mostly just overwrites numbers instead of churning sprites and groups
+    existing = group.sprites()
+    count = len(records)
+    for shape in existing[count:]:
+        shape.kill()
+    shapes = existing[:count]
+    for record in records[len(shapes):].tolist():
+        shapes.append(create(record))
+
+    fields = records.shape[1]
+    if store is not None:
+        slots = np.fromiter((shape.slot for shape in shapes), dtype=np.intp, count=count)
+        store.positions[slots] = records[:, 0:2]
+        store.previous_positions[slots] = records[:, 0:2]
+        store.velocities[slots] = records[:, 2:4]
+        if fields == ASTEROID_FIELDS:
+            store.radii[slots] = records[:, 4]
+        store.ages[slots] = records[:, -1]
+        return
+    for shape, record in zip(shapes, records.tolist()):
+        shape.position.update(record[0], record[1])
+        shape.previous_position.update(record[0], record[1])
+        shape.velocity.update(record[2], record[3])
+        if fields == ASTEROID_FIELDS:
+            shape.radius = record[4]
+        shape.age = record[-1]
+
+
+def restore_state(game, data):
+    """Put game back into the state save_state(game) captured. Works on a fresh Game too"""
+    (magic, version, game_over, frame, score, culled_count, x, y, rotation, timer, shots_fired,
+     spawn_timer, spawned, elapsed, table_key, asteroid_count, shot_count) = HEADER.unpack_from(data)
+    if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+        raise ValueError("not a game snapshot (or an unsupported version)")
+    offset = HEADER.size
+    has_gauss, gauss, *words = RNG_STATE.unpack_from(data, offset)
+    offset += RNG_STATE.size
+    asteroids = np.frombuffer(data, "<f8", asteroid_count * ASTEROID_FIELDS, offset)
+    offset += asteroids.nbytes
+    shots = np.frombuffer(data, "<f8", shot_count * SHOT_FIELDS, offset)
+
+    # new shapes have to land in this game's groups, store and pools
+    game.activate()
+    game.game_state = "game_over" if game_over else "playing"
+    game.frame = frame
+    game.score = score
+    game.culled_count = culled_count
+    game.accumulator = 0.0
+    game.rng.setstate((3, tuple(words), gauss if has_gauss else None))
+
+    player = game.player
+    player.position.update(x, y)
+    player.previous_position.update(x, y)
+    player.rotation = rotation
+    player.previous_rotation = rotation
+    player.timer = timer
+    player.shots_fired = shots_fired
+    field = game.asteroid_field
+    field.spawn_timer = spawn_timer
+    field.spawned = spawned
+    field.elapsed = elapsed
+    if table_key != field.table_key:
+        field.table_key = table_key
+        field.table_block = None
+
+    asteroid_class = game.asteroid_field.asteroid_class
+    shot_class = player.shot_class
+    restore_group(game.asteroids, lambda record: asteroid_class.create(record[0], record[1], record[4]),
+                  asteroids.reshape(-1, ASTEROID_FIELDS), game.entity_store)
+    restore_group(game.shots, lambda record: shot_class.create(record[0], record[1]),
+                  shots.reshape(-1, SHOT_FIELDS), game.entity_store)
+    # shapes killed above can be reused straight away, nothing is mid-frame
+    if game.entity_store is not None:
+        game.entity_store.recycle()
+    for pool in game.pools:
+        pool.recycle()
+
+
+# Snapshots of the last few seconds for rewinding. Holds as many as fit in
+# budget bytes: adding one drops the oldest until the total fits again
+class SnapshotRing:
+    def __init__(self, budget=SNAPSHOT_BUFFER_BYTES):
+        self.budget = budget
+        self.snapshots = deque()
+        self.size = 0
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    def push(self, data):
+        self.snapshots.append(data)
+        self.size += len(data)
+        while self.size > self.budget and self.snapshots:
+            self.size -= len(self.snapshots.popleft())
+
+    def pop(self):
+        """Newest snapshot, removed from the ring (None when empty)"""
+        if not self.snapshots:
+            return None
+        data = self.snapshots.pop()
+        self.size -= len(data)
+        return data
+
+    def clear(self):
+        self.snapshots.clear()
+        self.size = 0
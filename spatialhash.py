@@ -0,0 +1,69 @@
+from constants import *
+
+# Uniform grid used as a broad phase for collisions.
+# Shapes are bucketed by the cell their centre falls in, so as long as the cell
+# size is at least the largest combined radius of two shapes, anything that can
+# touch a shape is in its own cell or one of the 8 cells around it.
+class SpatialHash:
+    def __init__(self, cell_size=SPATIAL_HASH_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def cell_of(self, position):
+        return (int(position.x // self.cell_size), int(position.y // self.cell_size))
+
+    def clear(self):
+        self.cells.clear()
+
+    def insert(self, shape, order=0):
+        # order lets callers get candidates back in a stable order (e.g. group order)
+        self.cells.setdefault(self.cell_of(shape.position), []).append((order, shape))
+
+    def rebuild(self, shapes):
+        self.clear()
+        for order, shape in enumerate(shapes):
+            self.insert(shape, order)
+
+    def cells_between(self, start, end, padding):
+        # every cell under the box around a path from start to end, grown by padding
+        size = self.cell_size
+        x0 = int((min(start.x, end.x) - padding) // size)
+        x1 = int((max(start.x, end.x) + padding) // size)
+        y0 = int((min(start.y, end.y) - padding) // size)
+        y1 = int((max(start.y, end.y) + padding) // size)
+        return [(x, y) for x in range(x0, x1 + 1) for y in range(y0, y1 + 1)]
+
+    def rebuild_swept(self, shapes):
+        """Bucket every shape in each cell its path over the last step (plus its radius) touches"""
+        # Each shape only spreads over as many cells as it moved itself, so one
+        # fast shot doesn't make every query wider
+        self.clear()
+        for order, shape in enumerate(shapes):
+            entry = (order, shape)
+            for cell in self.cells_between(shape.previous_position, shape.position, shape.radius):
+                self.cells.setdefault(cell, []).append(entry)
+
+    def query_swept(self, start, end, padding):
+        """(order, shape) pairs from rebuild_swept that can have touched a circle of
+        radius padding moving from start to end, each once, in order"""
+        # two circles that touch anywhere along their paths have overlapping
+        # boxes, and overlapping boxes share a cell
+        found = {}
+        for cell in self.cells_between(start, end, padding):
+            bucket = self.cells.get(cell)
+            if bucket:
+                for order, shape in bucket:
+                    found[order] = shape
+        return sorted(found.items(), key=lambda entry: entry[0])
+
+    def query(self, position):
+        """Return (order, shape) pairs from the 3x3 block of cells around position"""
+        cx, cy = self.cell_of(position)
+        found = []
+        for x in (cx - 1, cx, cx + 1):
+            for y in (cy - 1, cy, cy + 1):
+                bucket = self.cells.get((x, y))
+                if bucket:
+                    found.extend(bucket)
+        found.sort(key=lambda entry: entry[0])
+        return found
@@ -0,0 +1,59 @@
+import math
+import pygame
+from constants import *
+
+
+# Pre-rendered images of everything the game draws, so a frame is just blits.
+# There are only a handful of asteroid sizes, one shot size and 360 useful ship
+# rotations, so rasterizing them all once at startup is cheap. scale is pixels
+# per world unit, for drawing the world at a different resolution.
+class SpriteAtlas:
+    def __init__(self, outline_width=OUTLINE_WIDTH, scale=1.0):
+        self.outline_width = outline_width
+        self.scale = scale
+        self.circles = {}
+        for kind in range(1, ASTEROID_KINDS + 1):
+            self.circle(ASTEROID_MIN_RADIUS * kind)
+        self.circle(SHOT_RADIUS)
+        # 3x3 square for shots drawn as dots
+        self.dot = self.new_surface(3)
+        self.dot.fill("white")
+        self.ships = [self.render_ship(angle, PLAYER_RADIUS * scale) for angle in range(360)]
+
+    def new_surface(self, size):
+        # black is the background anyway, so a colorkey is enough (and blits
+        # much faster than per-pixel alpha)
+        surface = pygame.Surface((size, size))
+        if pygame.display.get_surface() is not None:
+            surface = surface.convert()
+        surface.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+        return surface
+
+    def circle(self, radius):
+        """Return (surface, half_size) for an outlined circle of this radius"""
+        entry = self.circles.get(radius)
+        if entry is None:
+            half = math.ceil(radius * self.scale) + 1
+            surface = self.new_surface(half * 2)
+            pygame.draw.circle(surface, "white", (half, half), radius * self.scale, self.outline_width)
+            entry = (surface, half)
+            self.circles[radius] = entry
+        return entry
+
+    def render_ship(self, rotation, radius):
+        # same triangle as Player.triangle, centred in its own little surface
+        forward = pygame.Vector2(0, 1).rotate(rotation)
+        right = pygame.Vector2(0, 1).rotate(rotation + 90) * radius / 1.5
+        half = math.ceil(math.hypot(radius, radius / 1.5)) + 2
+        centre = pygame.Vector2(half, half)
+        points = [
+            centre + forward * radius,
+            centre - forward * radius - right,
+            centre - forward * radius + right,
+        ]
+        surface = self.new_surface(half * 2)
+        pygame.draw.polygon(surface, "white", points, self.outline_width)
+        return (surface, half)
+
+    def ship(self, rotation):
+        return self.ships[round(rotation) % 360]
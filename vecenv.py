@@ -0,0 +1,222 @@
+import os
+import numpy as np
+import pygame
+from constants import *
+from game import Game
+from inputsource import Controls, HeldInput
+from entitystore import EntityStore, KIND_ASTEROID, KIND_SHOT
+
+# Actions are the 5-bit button masks from Controls.to_bits (A=1, D=2, W=4, S=8, SPACE=16)
+NUM_ACTIONS = 32
+PLAYER_FEATURES = 5
+ASTEROID_FEATURES = 5
+ACTIONS = [Controls.from_bits(bits) for bits in range(NUM_ACTIONS)]
+
+
+# Gym-style reset()/step(actions) wrapper running N headless games in lockstep.
+# All N games keep their asteroids and shots in one shared entity store, each
+# slot tagged with its game, so moving them, the player and shot/asteroid
+# collision tests and culling run once per step for every game together, and
+# so do the observations. Only the per-game Python (the player, the spawner,
+# splitting what got hit) still goes game by game, see step_games.
+# use_shared_store=False gives every game its own store and steps them one
+# after the other instead, for cross-checking.
+#
+# Observations ("vector" mode) are float32 arrays of shape (N, 5 + K * 5):
+#   player: x, y (0..1), sin and cos of rotation, 1 if the gun is ready
+#   then the K nearest asteroids: dx, dy, dvx, dvy relative to the player
+#   (scaled by screen width / shot speed) and radius / ASTEROID_MAX_RADIUS,
+#   zero-padded when there are fewer than K
+# "raster" mode gives uint8 (N, H, W) frames: asteroids 255, shots 128, player 64
+class VecEnv:
+    def __init__(self, num_envs, seed=0, nearest=ENV_NEAREST_ASTEROIDS, observation="vector",
+                 raster_size=ENV_RASTER_SIZE, max_episode_steps=ENV_MAX_EPISODE_STEPS, use_shared_store=True):
+        if not pygame.display.get_init():
+            os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+            pygame.init()
+        self.num_envs = num_envs
+        self.nearest = nearest
+        self.observation = observation
+        self.raster_size = raster_size
+        self.max_episode_steps = max_episode_steps
+        self.dt = 1 / SIMULATION_RATE
+        self.inputs = [HeldInput() for _ in range(num_envs)]
+        self.games = [
+            Game(use_entity_store=True, seed=seed + i, input_source=self.inputs[i], headless=True, render=False)
+            for i in range(num_envs)
+        ]
+        self.use_shared_store = use_shared_store
+        self.store = EntityStore() if use_shared_store else None
+        if use_shared_store:
+            for i, game in enumerate(self.games):
+                game.share_store(self.store, i)
+        self.episode_steps = np.zeros(num_envs, dtype=np.int64)
+
+    def reset(self):
+        for game in self.games:
+            game.activate()
+            game.reset_game()
+            game.game_state = "playing"
+        self.episode_steps[:] = 0
+        return self.observe()
+
+    def step(self, actions):
+        """Returns (observations, rewards, terminated, truncated, infos). Finished games reset automatically"""
+        # score goes up by calculate_asteroid_points for every hit
+        scores_before = np.array([game.score for game in self.games])
+        for i, game in enumerate(self.games):
+            self.inputs[i].controls = ACTIONS[actions[i]]
+        if self.use_shared_store:
+            self.step_games()
+        else:
+            for game in self.games:
+                game.activate()
+                game.step(self.dt)
+        rewards = (np.array([game.score for game in self.games]) - scores_before).astype(np.float32)
+        terminated = np.array([game.game_state == "game_over" for game in self.games])
+        self.episode_steps += 1
+        truncated = ~terminated & (self.episode_steps >= self.max_episode_steps)
+
+        infos = []
+        for i, game in enumerate(self.games):
+            done = terminated[i] or truncated[i]
+            infos.append({"score": game.score, "frames": game.frame} if done else {})
+            if done:
+                game.activate()
+                game.reset_game()
+                game.game_state = "playing"
+                self.episode_steps[i] = 0
+        return self.observe(), rewards, terminated, truncated, infos
+
+    def step_games(self):
+        """Game.step for every game at once, with the store work done once for all of them"""
+        # the same work in the same order as Game.step and Game.update, so
+        # each game ends up exactly where stepping it on its own would take it
+        store = self.store
+        games = self.games
+        dt = self.dt
+        swept = games[0].use_swept_collisions
+        if swept:
+            store.save_previous_state()
+            for game in games:
+                game.player.save_previous_state()
+        store.update(dt)
+        for game in games:
+            game.activate()
+            game.dt = dt
+            game.updatable.update(dt)
+
+        players = [game.player for game in games]
+        positions = np.array([(player.position.x, player.position.y) for player in players])
+        starts = np.array([(player.previous_position.x, player.previous_position.y) for player in players]) if swept else None
+        radii = np.array([player.radius for player in players], dtype=float)
+        player_hits = store.overlaps_by_owner(positions, radii, KIND_ASTEROID, starts)
+        asteroid_slots, shot_slots = store.find_overlaps(KIND_ASTEROID, KIND_SHOT, swept=swept)
+        # pairs come sorted across all games, which keeps each game's own in order too
+        hit_owners = store.owners[asteroid_slots]
+        for i, game in enumerate(games):
+            game.activate()
+            if player_hits[i]:
+                game.game_state = "game_over"
+            mine = hit_owners == i
+            game.resolve_stored_hits(asteroid_slots[mine], shot_slots[mine])
+
+        expired = [[] for _ in games]
+        for view in store.expired_views():
+            expired[store.owners[view.slot]].append(view)
+        for game, views in zip(games, expired):
+            game.remove_expired(views)
+        store.recycle()
+        for game in games:
+            for pool in game.pools:
+                pool.recycle()
+            game.frame += 1
+            for listener in game.tick_listeners:
+                listener.on_tick(game)
+
+    def gather(self, kind):
+        # every live asteroid (or shot) of every game, with the index of its game
+        # and its serial (allocation order, the same however the store is laid out)
+        if self.use_shared_store:
+            store = self.store
+            slots = store.live_slots(kind)
+            return (store.positions[slots], store.velocities[slots], store.radii[slots],
+                    store.owners[slots], store.serials[slots])
+        positions = []
+        velocities = []
+        radii = []
+        owners = []
+        serials = []
+        for i, game in enumerate(self.games):
+            store = game.entity_store
+            slots = store.live_slots(kind)
+            positions.append(store.positions[slots])
+            velocities.append(store.velocities[slots])
+            radii.append(store.radii[slots])
+            owners.append(np.full(len(slots), i))
+            serials.append(store.serials[slots])
+        return (np.concatenate(positions), np.concatenate(velocities), np.concatenate(radii),
+                np.concatenate(owners), np.concatenate(serials))
+
+    def player_state(self):
+        players = [game.player for game in self.games]
+        positions = np.array([(player.position.x, player.position.y) for player in players])
+        rotations = np.radians([player.rotation for player in players])
+        gun_ready = np.array([player.timer <= 0 for player in players], dtype=np.float32)
+        return positions, rotations, gun_ready
+
+    def observe(self):
+        if self.observation == "raster":
+            return self.observe_raster()
+        return self.observe_vector()
+
+    def observe_vector(self):
+        player_positions, rotations, gun_ready = self.player_state()
+        obs = np.zeros((self.num_envs, PLAYER_FEATURES + self.nearest * ASTEROID_FEATURES), dtype=np.float32)
+        obs[:, 0] = player_positions[:, 0] / SCREEN_WIDTH
+        obs[:, 1] = player_positions[:, 1] / SCREEN_HEIGHT
+        obs[:, 2] = np.sin(rotations)
+        obs[:, 3] = np.cos(rotations)
+        obs[:, 4] = gun_ready
+
+        positions, velocities, radii, owners, serials = self.gather(KIND_ASTEROID)
+        if len(owners) == 0:
+            return obs
+        relative = positions - player_positions[owners]
+        distance = np.einsum("ij,ij->i", relative, relative)
+        # sort by game, then by distance (split fragments start out tied, the
+        # older one goes first), and keep the first K of each game
+        order = np.lexsort((serials, distance, owners))
+        owners = owners[order]
+        starts = np.searchsorted(owners, np.arange(self.num_envs))
+        rank = np.arange(len(owners)) - starts[owners]
+        keep = rank < self.nearest
+        order = order[keep]
+        owners = owners[keep]
+        rank = rank[keep]
+
+        features = np.empty((len(order), ASTEROID_FEATURES), dtype=np.float32)
+        features[:, 0:2] = relative[order] / SCREEN_WIDTH
+        features[:, 2:4] = velocities[order] / PLAYER_SHOOT_SPEED
+        features[:, 4] = radii[order] / ASTEROID_MAX_RADIUS
+        asteroid_obs = obs[:, PLAYER_FEATURES:].reshape(self.num_envs, self.nearest, ASTEROID_FEATURES)
+        asteroid_obs[owners, rank] = features
+        return obs
+
+    def observe_raster(self):
+        width, height = self.raster_size
+        frames = np.zeros((self.num_envs, height, width), dtype=np.uint8)
+        scale = np.array([width / SCREEN_WIDTH, height / SCREEN_HEIGHT])
+
+        def plot(positions, owners, value):
+            cells = np.floor(positions * scale).astype(np.int64)
+            on_screen = (cells[:, 0] >= 0) & (cells[:, 0] < width) & (cells[:, 1] >= 0) & (cells[:, 1] < height)
+            frames[owners[on_screen], cells[on_screen, 1], cells[on_screen, 0]] = value
+
+        positions, _, _, owners, _ = self.gather(KIND_SHOT)
+        plot(positions, owners, 128)
+        positions, _, _, owners, _ = self.gather(KIND_ASTEROID)
+        plot(positions, owners, 255)
+        player_positions, _, _ = self.player_state()
+        plot(player_positions, np.arange(self.num_envs), 64)
+        return frames
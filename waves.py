@@ -0,0 +1,108 @@
+import json
+from typing import NamedTuple
+from constants import *
+
+
+# One stage of the asteroid spawner: every `interval` seconds a batch of
+# `batch` asteroids comes in from the edges, for `duration` seconds
+class Wave(NamedTuple):
+    interval: float  # seconds between batches
+    batch: int = 1  # asteroids per batch
+    duration: float = None  # seconds until the next wave, None = for the rest of the game
+    speed: tuple = None  # px/s, (min, max), None = ASTEROID_SPAWN_SPEED
+    spread: float = None  # degrees either side of straight in from the edge, None = ASTEROID_SPAWN_SPREAD
+    kinds: tuple = None  # sizes, in ASTEROID_MIN_RADIUS steps, None = all ASTEROID_KINDS of them
+    max_asteroids: int = None  # hold off while this many are alive, None = no limit
+
+
+# Waves played in order. If the last one has a duration it repeats, with ramp
+# times as many asteroids per batch every time round, so density keeps growing.
+#
+# Wave scripts are JSON files, e.g.
+#   {"ramp": 1.5,
+#    "waves": [{"interval": 0.8, "duration": 30},
+#              {"interval": 0.5, "batch": 4, "duration": 30, "speed": [60, 140]},
+#              {"interval": 0.25, "batch": 8, "duration": 20, "kinds": [1, 2], "max_asteroids": 3000}]}
+# Any Wave field can be given, the rest keep their defaults
+class WaveSchedule:
+    def __init__(self, waves, ramp=1.0):
+        waves = list(waves)
+        if not waves:
+            raise ValueError("a wave schedule needs at least one wave")
+        if any(wave.duration is None for wave in waves[:-1]):
+            raise ValueError("only the last wave can go on forever")
+        # defaults come from constants.py now rather than when this module
+        # was imported, so batchrunner's overrides reach them
+        waves = [wave._replace(
+            speed=ASTEROID_SPAWN_SPEED if wave.speed is None else wave.speed,
+            spread=ASTEROID_SPAWN_SPREAD if wave.spread is None else wave.spread,
+            kinds=tuple(range(1, ASTEROID_KINDS + 1)) if wave.kinds is None else wave.kinds,
+        ) for wave in waves]
+        for number, wave in enumerate(waves, 1):
+            problem = wave_problem(wave)
+            if problem is not None:
+                raise ValueError(f"wave {number}: {problem}")
+        self.waves = waves
+        self.ramp = ramp
+
+    def wave_at(self, elapsed):
+        """(wave, batch size) for the wave playing `elapsed` seconds into the game"""
+        for wave in self.waves[:-1]:
+            if elapsed < wave.duration:
+                return wave, wave.batch
+            elapsed -= wave.duration
+        last = self.waves[-1]
+        if last.duration is None:
+            return last, last.batch
+        loops = int(elapsed // last.duration)
+        return last, max(1, round(last.batch * self.ramp ** loops))
+
+    @classmethod
+    def from_dict(cls, data):
+        waves = []
+        for number, fields in enumerate(data["waves"], 1):
+            fields = dict(fields)
+            for name in ("speed", "kinds"):
+                if name in fields:
+                    fields[name] = tuple(fields[name])
+            try:
+                waves.append(Wave(**fields))
+            except TypeError as error:
+                raise ValueError(f"wave {number}: {error}") from None
+        return cls(waves, data.get("ramp", 1.0))
+
+    def to_dict(self):
+        return {"ramp": self.ramp, "waves": [wave._asdict() for wave in self.waves]}
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls.from_dict(json.load(file))
+
+
+def wave_problem(wave):
+    # what makes a wave unplayable, or None. A zero interval would spawn
+    # forever within one step, a zero duration would never end
+    if not wave.interval > 0:
+        return "interval has to be more than 0"
+    if wave.duration is not None and not wave.duration > 0:
+        return "duration has to be more than 0"
+    if wave.batch < 1:
+        return "batch has to be at least 1"
+    if not wave.kinds:
+        return "kinds can't be empty"
+    # kind k spawns radius k * ASTEROID_MIN_RADIUS, anything outside 1..ASTEROID_KINDS
+    # is either a dot or bigger than the spatial hash cells are sized for
+    for kind in wave.kinds:
+        if isinstance(kind, bool) or not isinstance(kind, int) or not 1 <= kind <= ASTEROID_KINDS:
+            return f"kinds have to be whole numbers from 1 to {ASTEROID_KINDS}, got {kind!r}"
+    if isinstance(wave.spread, bool) or not isinstance(wave.spread, (int, float)) or not 0 <= wave.spread < 90:
+        return "spread has to be a number of degrees from 0 up to 90 (or they head back off screen)"
+    if len(wave.speed) != 2 or wave.speed[0] > wave.speed[1]:
+        return "speed has to be a [min, max] range"
+    return None
+
+
+def classic_waves():
+    # the original game: one asteroid every ASTEROID_SPAWN_RATE seconds, forever
+    return WaveSchedule([Wave(ASTEROID_SPAWN_RATE)])